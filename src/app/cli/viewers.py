@@ -13,6 +13,16 @@ class Viewer(Protocol):
         ...
 
 
+class Progress(Protocol):
+    """
+    Progress of a long operation, displayed by its string representation.
+    """
+
+    @property
+    def is_finished(self) -> bool:
+        ...
+
+
 class TypingDisabledViewer:
     def __init__(self, formatters_dict: dict[str, str] = None) -> None:
         self._formatters_dict = formatters_dict
@@ -55,3 +65,20 @@ class TypingEnabledViewer:
 
     def __str__(self):
         return f"{self.__class__.__name__}({self.min_delay=}, {self.max_delay=}, {self._formatters_dict})"
+
+
+class ProgressViewer:
+    """
+    Callback displaying progress of a long operation in one line,
+    which is rewritten on every update and ended when the operation is finished.
+    """
+
+    __slots__ = ("_title", "_viewer")
+
+    def __init__(self, title: str, viewer: Viewer | None = None) -> None:
+        self._title = title
+        self._viewer = viewer or TypingDisabledViewer(formatters_dict={})
+
+    def __call__(self, progress: Progress) -> None:
+        end = "\n" if progress.is_finished else ""
+        self._viewer.display(f"\r{self._title}: {progress}\033[K{end}")
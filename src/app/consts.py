@@ -2,5 +2,10 @@ from pathlib import Path
 
 
 CONFIG_FILE_PATH = Path("src/config.yaml")
-PICKLE_FILE_PATH = Path("src/game.pickle")
+SAVE_FILE_PATH = Path("src/game.json")
+JOURNAL_FILE_PATH = Path("src/game.journal")
 HISTORY_FILE_PATH = Path("src/history.log")
+LIBRARY_INDEX_FILE_PATH = Path("src/library.sqlite")
+LOG_FILE_PATH = Path("src/app.log")
+SAMPLE_CACHE_PATH = Path("src/samples_cache")
+PROXY_PACK_PATH = Path("src/proxy.pack")
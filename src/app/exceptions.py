@@ -24,3 +24,38 @@ class InvalidGameFileError(SongRouletteError):
     Exception raised when a game file is invalid.
     """
     pass
+
+
+class ProbeError(SongRouletteError):
+    """
+    Exception raised when headers of an audiofile cannot be parsed.
+    """
+    pass
+
+
+class DecodingError(SongRouletteError):
+    """
+    Exception raised when an audiofile cannot be decoded.
+    """
+    pass
+
+
+class InvalidPackFileError(SongRouletteError):
+    """
+    Exception raised when a proxy pack file is invalid.
+    """
+    pass
+
+
+class PreparationError(SongRouletteError):
+    """
+    Exception raised when a song cannot be prepared for the game.
+    """
+    pass
+
+
+class NotEnoughSongsError(SongRouletteError):
+    """
+    Exception raised when a library has fewer audiofiles than rounds of the game.
+    """
+    pass
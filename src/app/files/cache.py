@@ -0,0 +1,214 @@
+import hashlib
+import mmap
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Hashable
+
+from app.files.segments import PlayableSegment
+
+
+_BLOCK_SIZE = 64 * 1024
+_EXTENSION = ".pcm"
+
+
+def content_hash(path: str | Path) -> str:
+    """
+    Cheap hash of the file content: its size and its first and last blocks.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as file:
+        digest.update(file.read(_BLOCK_SIZE))
+        if size > _BLOCK_SIZE:
+            file.seek(max(size - _BLOCK_SIZE, _BLOCK_SIZE))
+            digest.update(file.read(_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class SampleKey:
+    content_hash: str
+    start: int  # in ms
+    duration: int  # in ms
+    sample_rate: int
+    channels: int
+
+    @property
+    def file_name(self) -> str:
+        return (
+            f"{self.content_hash}-{self.start}-{self.duration}-"
+            f"{self.sample_rate}-{self.channels}{_EXTENSION}"
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PeakKey:
+    """
+    Peak of a whole decoded track, cached with its samples,
+    so the track is decoded once to measure it.
+    """
+
+    content_hash: str
+    sample_rate: int
+    channels: int
+
+    @property
+    def file_name(self) -> str:
+        return (
+            f"{self.content_hash}-peak-{self.sample_rate}-{self.channels}{_EXTENSION}"
+        )
+
+
+class SampleCache:
+    """
+    Content-addressed cache of decoded samples stored on disk as raw PCM.
+
+    Files are found by the content of audiofiles, so moved or renamed
+    files hit the cache too. Hits are memory-mapped, not read.
+    Reading a sample marks it as recently used, least recently used samples
+    are evicted when the cache exceeds `max_size`.
+
+    The directory is walked once, on the first use, then sizes and the order
+    of use are tracked in memory. Writes are atomic, so the cache can be shared
+    by several processes, each of them tracks only what it sees, so the limit
+    is approximate when several processes write at once.
+    """
+
+    __slots__ = ("_dir_path", "_max_size", "_files", "_size")
+
+    def __init__(self, dir_path: str | Path, max_size: int) -> None:
+        self._dir_path = str(dir_path)
+        self._max_size = max_size  # in bytes
+        self._files: OrderedDict[str, int] | None = None  # sizes, by the last use
+        self._size = 0
+
+    def __reduce__(self):
+        # other processes get their own instance, not a copy of this index
+        return open_sample_cache, (self._dir_path, self._max_size)
+
+    @property
+    def size(self) -> int:
+        self._index()
+        return self._size
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self._dir_path, file_name)
+
+    def _index(self) -> OrderedDict[str, int]:
+        if self._files is not None:
+            return self._files
+
+        files = []
+        try:
+            with os.scandir(self._dir_path) as iterator:
+                for entry in iterator:
+                    if not entry.name.endswith(_EXTENSION):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        except FileNotFoundError:
+            pass
+
+        self._files = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._size = sum(self._files.values())
+        return self._files
+
+    def _track(self, file_name: str, size: int) -> None:
+        files = self._index()
+        self._size += size - files.pop(file_name, 0)
+        files[file_name] = size
+
+    def get(self, key: SampleKey | PeakKey) -> memoryview | None:
+        """
+        PCM of the sample as a view of the memory-mapped file,
+        None if it is not cached.
+        """
+        path = self._path(key.file_name)
+        try:
+            with open(path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)  # modification time is the time of the last use
+        except (OSError, ValueError):  # ValueError for an empty file
+            return None
+
+        self._track(key.file_name, len(data))
+        return memoryview(data)
+
+    def put(self, key: SampleKey | PeakKey, data: bytes | memoryview) -> None:
+        if len(data) > self._max_size:
+            return
+
+        os.makedirs(self._dir_path, exist_ok=True)
+        with NamedTemporaryFile(
+            "wb", dir=self._dir_path, suffix=".tmp", delete=False
+        ) as file:
+            file.write(data)
+        os.replace(file.name, self._path(key.file_name))
+
+        self._track(key.file_name, len(data))
+        self._evict()
+
+    def _evict(self) -> None:
+        files = self._index()
+        while self._size > self._max_size:
+            file_name, size = files.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(file_name))
+            except OSError:  # evicted by another process
+                pass
+
+
+@cache
+def open_sample_cache(dir_path: str, max_size: int) -> SampleCache:
+    """
+    The same cache for the same directory in a process,
+    so the directory is walked once per process.
+    """
+    return SampleCache(dir_path, max_size)
+
+
+class SegmentsLRU:
+    """
+    In-memory cache of decoded segments limited by the total size of their PCM.
+    Least recently used segments are dropped first.
+    """
+
+    __slots__ = ("_max_size", "_segments", "_size")
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size  # in bytes
+        self._segments: OrderedDict[Hashable, PlayableSegment] = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: Hashable) -> PlayableSegment | None:
+        if (segment := self._segments.get(key)) is not None:
+            self._segments.move_to_end(key)
+        return segment
+
+    def put(self, key: Hashable, segment: PlayableSegment) -> None:
+        if (previous := self._segments.pop(key, None)) is not None:
+            self._size -= len(previous.raw_data)
+        if len(segment.raw_data) > self._max_size:
+            return
+
+        self._segments[key] = segment
+        self._size += len(segment.raw_data)
+        while self._size > self._max_size:
+            _, evicted = self._segments.popitem(last=False)
+            self._size -= len(evicted.raw_data)
+
+    def clear(self) -> None:
+        self._segments.clear()
+        self._size = 0
@@ -0,0 +1,192 @@
+import struct
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generator, Self
+
+from app.exceptions import DecodingError, ProbeError
+from app.files.cache import content_hash, PeakKey, SampleCache, SampleKey
+from app.files.formats import AllowedFormats
+from app.files.probe import probe
+from app.files.segments import PlayableSegment
+
+
+SAMPLE_WIDTH = PlayableSegment.sample_width
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_CHANNELS = 2
+STREAM_CHUNK_FRAMES = 2048  # about 46 ms at 44.1 kHz
+
+_DECODER = "ffmpeg"
+_PEAK = struct.Struct("<d")  # in dBFS
+
+
+@dataclass(frozen=True, slots=True)
+class Window:
+    start: int  # in ms
+    duration: int  # in ms
+
+
+@dataclass(frozen=True, slots=True)
+class PcmFormat:
+    sample_rate: int = DEFAULT_SAMPLE_RATE
+    channels: int = DEFAULT_CHANNELS
+
+    @classmethod
+    def from_file(cls, path: str | Path, format_: AllowedFormats | None = None) -> Self:
+        """
+        PCM format of the decoded file, taken from its headers if possible.
+        """
+        try:
+            result = probe(path, format_)
+        except ProbeError:
+            return cls()
+        return cls(sample_rate=result.sample_rate, channels=result.channels)
+
+
+def _decode_command(
+    path: str | Path,
+    pcm_format: PcmFormat,
+    start: int | None = None,
+    duration: int | None = None,
+) -> list[str]:
+    command = [_DECODER, "-nostdin", "-hide_banner", "-loglevel", "error"]
+    if start is not None:  # seeking before the input is fast and frame accurate
+        command += ["-ss", f"{start / 1000:.3f}"]
+    if duration is not None:
+        command += ["-t", f"{duration / 1000:.3f}"]
+    command += ["-i", str(path), "-vn"]
+    command += ["-f", "s16le", "-acodec", "pcm_s16le"]
+    command += ["-ar", str(pcm_format.sample_rate), "-ac", str(pcm_format.channels)]
+    return command + ["-"]
+
+
+def _decode(
+    path: str | Path, window: Window | None, pcm_format: PcmFormat
+) -> PlayableSegment:
+    command = (
+        _decode_command(path, pcm_format)
+        if window is None
+        else _decode_command(path, pcm_format, window.start, window.duration)
+    )
+    process = subprocess.run(command, capture_output=True)
+    if process.returncode:
+        message = process.stderr.decode(errors="replace").strip()
+        raise DecodingError(f"Failed to decode {path}: {message}")
+
+    return _segment_from_pcm(process.stdout, pcm_format)
+
+
+def _segment_from_pcm(data: bytes, pcm_format: PcmFormat) -> PlayableSegment:
+    return PlayableSegment.from_pcm(
+        data, frame_rate=pcm_format.sample_rate, channels=pcm_format.channels
+    )
+
+
+def decode_windows(
+    path: str | Path,
+    windows: list[Window],
+    format_: AllowedFormats | None = None,
+    pcm_format: PcmFormat | None = None,
+    cache: SampleCache | None = None,
+    file_hash: str | None = None,
+) -> list[PlayableSegment]:
+    """
+    Decode only given windows of the audiofile, one ffmpeg run per window.
+    Decoding starts from the nearest point of the file the window starts in,
+    so nothing before and after the window is decoded.
+    Windows found in the cache are not decoded at all, they are looked up
+    by `file_hash`, which is computed here if it is not known yet.
+    """
+    pcm_format = pcm_format or PcmFormat.from_file(path, format_)
+    if cache is None:
+        return [_decode(path, window, pcm_format) for window in windows]
+
+    file_hash = file_hash or content_hash(path)
+    segments = []
+    for window in windows:
+        key = SampleKey(
+            content_hash=file_hash,
+            start=window.start,
+            duration=window.duration,
+            sample_rate=pcm_format.sample_rate,
+            channels=pcm_format.channels,
+        )
+        if (data := cache.get(key)) is not None:
+            segments.append(_segment_from_pcm(data, pcm_format))
+            continue
+
+        segment = _decode(path, window, pcm_format)
+        cache.put(key, segment.raw_data)
+        segments.append(segment)
+
+    return segments
+
+
+def decode_full(
+    path: str | Path,
+    format_: AllowedFormats | None = None,
+    pcm_format: PcmFormat | None = None,
+) -> PlayableSegment:
+    pcm_format = pcm_format or PcmFormat.from_file(path, format_)
+    return _decode(path, None, pcm_format)
+
+
+def decode_peak(
+    path: str | Path,
+    format_: AllowedFormats | None = None,
+    pcm_format: PcmFormat | None = None,
+    cache: SampleCache | None = None,
+    file_hash: str | None = None,
+) -> float:
+    """
+    Peak of the whole decoded audiofile in dBFS. With the cache the file
+    is decoded only the first time, then its peak is looked up by `file_hash`.
+    """
+    pcm_format = pcm_format or PcmFormat.from_file(path, format_)
+    if cache is None:
+        return _decode(path, None, pcm_format).max_dBFS
+
+    key = PeakKey(
+        content_hash=file_hash or content_hash(path),
+        sample_rate=pcm_format.sample_rate,
+        channels=pcm_format.channels,
+    )
+    if (data := cache.get(key)) is not None and len(data) == _PEAK.size:
+        return _PEAK.unpack(data)[0]
+
+    peak = _decode(path, None, pcm_format).max_dBFS
+    cache.put(key, _PEAK.pack(peak))
+    return peak
+
+
+def stream_segments(
+    path: str | Path,
+    start: int = 0,
+    pcm_format: PcmFormat | None = None,
+    chunk_frames: int = STREAM_CHUNK_FRAMES,
+) -> Generator[PlayableSegment, None, None]:
+    """
+    Decode the audiofile from `start` (in ms) in chunks of `chunk_frames` frames.
+    Chunks are decoded only as fast as they are taken, as ffmpeg is blocked
+    by the pipe, and decoding is stopped when the generator is closed.
+    The default PCM format is used unless given, so the file is not probed.
+    """
+    pcm_format = pcm_format or PcmFormat()
+    process = subprocess.Popen(
+        _decode_command(path, pcm_format, start=start),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    chunk_size = chunk_frames * SAMPLE_WIDTH * pcm_format.channels
+    try:
+        while chunk := process.stdout.read(chunk_size):
+            yield _segment_from_pcm(chunk, pcm_format)
+
+        if process.wait():
+            message = process.stderr.read().decode(errors="replace").strip()
+            raise DecodingError(f"Failed to decode {path}: {message}")
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+        process.stderr.close()
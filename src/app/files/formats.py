@@ -0,0 +1,108 @@
+import os
+from enum import StrEnum
+from functools import cache
+from pathlib import Path
+from typing import Self
+
+from magic import Magic
+
+from app.exceptions import NotSupportedFormatError
+
+
+class AllowedFormats(StrEnum):
+    FLAC = "audio/x-flac"
+    MP3 = "audio/mpeg"
+    WAV = "audio/x-wav"
+
+    @classmethod
+    def from_path(cls, path: str | Path) -> Self:
+        if (file_format := detect_format(path)) is None:
+            raise NotSupportedFormatError("Not correct format of file")
+        return file_format
+
+
+_EXTENSIONS_MAPPING = {
+    ".flac": AllowedFormats.FLAC,
+    ".mp3": AllowedFormats.MP3,
+    ".wav": AllowedFormats.WAV,
+    ".wave": AllowedFormats.WAV,
+}
+
+# files which are often found in music libraries, but are never supported audio
+_REJECTED_EXTENSIONS = frozenset(
+    (
+        # covers and booklets
+        ".jpg .jpeg .png .gif .bmp .webp .tif .tiff .pdf "
+        # rips' metadata
+        ".cue .log .txt .nfo .md5 .sfv .ffp .accurip .lrc "
+        # playlists and service files
+        ".m3u .m3u8 .pls .db .ini .json .xml .url .ds_store "
+        # not supported audio and video
+        ".m4a .aac .ogg .opus .wma .ape .aiff .aif .mp4 .mkv"
+    ).split()
+)
+
+_MIME_TYPES_MAPPING = {
+    "audio/x-flac": AllowedFormats.FLAC,
+    "audio/flac": AllowedFormats.FLAC,
+    "audio/mpeg": AllowedFormats.MP3,
+    "audio/mp3": AllowedFormats.MP3,
+    "audio/x-wav": AllowedFormats.WAV,
+    "audio/wav": AllowedFormats.WAV,
+    "audio/wave": AllowedFormats.WAV,
+    "audio/vnd.wave": AllowedFormats.WAV,
+}
+
+_HEADER_LENGTH = 12
+
+
+@cache
+def _get_magic() -> Magic:
+    """
+    libmagic handle shared by all calls in the process.
+    """
+    return Magic(mime=True)
+
+
+def is_rejected_by_extension(path: str | Path) -> bool:
+    """
+    Check if the file is surely not a supported audiofile without opening it.
+    """
+    return os.path.splitext(path)[1].lower() in _REJECTED_EXTENSIONS
+
+
+def _sniff_header(header: bytes) -> AllowedFormats | None:
+    if header[:4] == b"fLaC":
+        return AllowedFormats.FLAC
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return AllowedFormats.WAV
+    if header[:3] == b"ID3" or (
+        len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0
+    ):
+        return AllowedFormats.MP3
+    return None
+
+
+def detect_format(path: str | Path) -> AllowedFormats | None:
+    """
+    Detect format of the file or return None for not supported files.
+
+    Extension is checked first: files with known non-audio extensions are
+    rejected without opening, audio extensions are confirmed by magic bytes
+    of the file header. Only ambiguous files are sniffed with libmagic.
+    """
+    if is_rejected_by_extension(path):
+        return None
+
+    try:
+        with open(path, "rb") as file:
+            header = file.read(_HEADER_LENGTH)
+    except OSError:
+        return None
+
+    expected_format = _EXTENSIONS_MAPPING.get(os.path.splitext(path)[1].lower())
+    if expected_format is not None and _sniff_header(header) == expected_format:
+        return expected_format
+
+    mime_type = _get_magic().from_file(str(path))
+    return _MIME_TYPES_MAPPING.get(mime_type)
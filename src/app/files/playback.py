@@ -0,0 +1,237 @@
+import logging
+import struct
+import subprocess
+import time
+from enum import StrEnum, auto
+from tempfile import NamedTemporaryFile
+from threading import Thread
+from typing import Generator, Protocol, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.files.segments import PlayableSegment
+
+
+logger = logging.getLogger(__name__)
+
+_PLAYER = "ffplay"
+_UNKNOWN_SIZE = 0xFFFFFFFF
+_FEEDER_TIMEOUT = 1.0  # in seconds
+
+
+class PlaybackBackend(StrEnum):
+    SIMPLEAUDIO = auto()  # raw PCM handed to the audio device in process
+    FFPLAY = auto()  # WAV file played by a separate ffplay process
+
+
+class Playback(Protocol):
+    """
+    Handle of started playback.
+    """
+
+    def is_playing(self) -> bool:
+        ...
+
+    def wait(self) -> None:
+        ...
+
+    def stop(self) -> None:
+        ...
+
+
+class SimpleaudioPlayback:
+    __slots__ = ("_play_object",)
+
+    def __init__(self, segment: "PlayableSegment") -> None:
+        import simpleaudio
+
+        self._play_object = simpleaudio.play_buffer(
+            segment.raw_data,
+            num_channels=segment.channels,
+            bytes_per_sample=segment.sample_width,
+            sample_rate=segment.frame_rate,
+        )
+
+    def is_playing(self) -> bool:
+        return self._play_object.is_playing()
+
+    def wait(self) -> None:
+        self._play_object.wait_done()
+
+    def stop(self) -> None:
+        self._play_object.stop()
+
+
+class FfplayPlayback:
+    __slots__ = ("_file", "_process")
+
+    def __init__(self, segment: "PlayableSegment") -> None:
+        data = segment.raw_data
+        self._file = NamedTemporaryFile("w+b", suffix=".wav")
+        self._file.write(
+            _wav_header(
+                segment.frame_rate, segment.channels, segment.sample_width, len(data)
+            )
+        )
+        self._file.write(data)
+        self._file.flush()
+
+        default_command = [_PLAYER, "-nodisp", "-autoexit", "-hide_banner"]
+        log_suppress_param = ["-loglevel", "quiet"]
+        self._process = subprocess.Popen(
+            default_command + log_suppress_param + [self._file.name]
+        )
+
+    def is_playing(self) -> bool:
+        return self._process.poll() is None
+
+    def wait(self) -> None:
+        self._process.wait()
+        self._file.close()
+
+    def stop(self) -> None:
+        self._process.terminate()
+        self.wait()
+
+
+def _wav_header(
+    sample_rate: int, channels: int, sample_width: int, data_size: int | None = None
+) -> bytes:
+    """
+    Header of WAV with `data_size` bytes of PCM. If the size is not given,
+    it is unknown, and players read the data until the end of input.
+    """
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        _UNKNOWN_SIZE if data_size is None else data_size + 36,
+        b"WAVE",
+        b"fmt ",
+        16,  # size of the format chunk
+        1,  # PCM
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        sample_width * 8,
+        b"data",
+        _UNKNOWN_SIZE if data_size is None else data_size,
+    )
+
+
+class FfplayStreamPlayback:
+    """
+    Chunks of PCM are fed to ffplay through its standard input as they are given,
+    so playback starts before the rest of audio is decoded.
+    """
+
+    __slots__ = ("_process", "_feeder")
+
+    def __init__(
+        self,
+        chunks: Generator["PlayableSegment", None, None],
+        sample_rate: int,
+        channels: int,
+        sample_width: int,
+    ) -> None:
+        default_command = [_PLAYER, "-nodisp", "-autoexit", "-hide_banner"]
+        log_suppress_param = ["-loglevel", "quiet"]
+        no_probing_param = ["-probesize", "32", "-analyzeduration", "0"]
+        self._process = subprocess.Popen(
+            default_command + log_suppress_param + no_probing_param + ["-i", "-"],
+            stdin=subprocess.PIPE,
+        )
+
+        header = _wav_header(sample_rate, channels, sample_width)
+        self._feeder = Thread(target=self._feed, args=(header, chunks), daemon=True)
+        self._feeder.start()
+
+    def _feed(
+        self, header: bytes, chunks: Generator["PlayableSegment", None, None]
+    ) -> None:
+        try:
+            self._process.stdin.write(header)
+            for chunk in chunks:
+                self._process.stdin.write(chunk.raw_data)
+        except (BrokenPipeError, ValueError):  # playback is stopped
+            pass
+        except Exception as e:
+            logger.error("Failed to stream audio: %s", e)
+        finally:
+            chunks.close()
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def is_playing(self) -> bool:
+        return self._process.poll() is None
+
+    def wait(self) -> None:
+        self._process.wait()
+        self._feeder.join(timeout=_FEEDER_TIMEOUT)
+
+    def stop(self) -> None:
+        self._process.terminate()
+        self.wait()
+
+
+def _log_latency(backend: str, requested_at: float) -> None:
+    latency = (time.perf_counter() - requested_at) * 1000
+    logger.info("Playback with %s started in %.1f ms", backend, latency)
+
+
+def start_stream(
+    chunks: Generator["PlayableSegment", None, None],
+    sample_rate: int,
+    channels: int,
+    sample_width: int,
+    requested_at: float | None = None,
+) -> Playback:
+    """
+    Start playing chunks as they are given, with ffplay, as simpleaudio
+    can play only whole buffers.
+    """
+    requested_at = requested_at or time.perf_counter()
+    playback = FfplayStreamPlayback(chunks, sample_rate, channels, sample_width)
+    _log_latency("ffplay stream", requested_at)
+    return playback
+
+
+def start_playback(
+    segment: "PlayableSegment",
+    backend: PlaybackBackend = PlaybackBackend.SIMPLEAUDIO,
+    requested_at: float | None = None,
+) -> Playback:
+    """
+    Start playing the segment without waiting for its end, falling back
+    to ffplay if simpleaudio is not installed or can not open the audio device.
+    Latency from the request of playback to its start is logged,
+    for ffplay it is measured up to the start of its process.
+    """
+    requested_at = requested_at or time.perf_counter()
+
+    playback: Playback | None = None
+    if backend == PlaybackBackend.SIMPLEAUDIO:
+        try:
+            playback = SimpleaudioPlayback(segment)
+        except Exception as e:  # ImportError or errors of the audio device
+            logger.warning("Failed to play with simpleaudio, using ffplay: %s", e)
+            backend = PlaybackBackend.FFPLAY
+
+    if playback is None:
+        playback = FfplayPlayback(segment)
+
+    _log_latency(backend, requested_at)
+    return playback
+
+
+def play_segment(
+    segment: "PlayableSegment",
+    backend: PlaybackBackend = PlaybackBackend.SIMPLEAUDIO,
+    requested_at: float | None = None,
+) -> None:
+    """
+    Play the segment until its end.
+    """
+    start_playback(segment, backend, requested_at).wait()
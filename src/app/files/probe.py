@@ -0,0 +1,530 @@
+"""
+Header-only probing of audiofiles.
+
+Reads just the headers of a file (a few KB) to get its exact duration,
+sample rate, number of channels and core tags:
+    -- FLAC: STREAMINFO and VORBIS_COMMENT metadata blocks;
+    -- MP3: ID3v2 (or ID3v1) tag and Xing/Info, LAME or VBRI header of the first frame;
+    -- WAV: RIFF "fmt ", "data" and "LIST/INFO" chunks.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, BinaryIO, Callable
+
+import music_tag
+
+from app.exceptions import ProbeError
+from app.files.formats import AllowedFormats
+
+
+TAGS_FIELDS = ("title", "artist", "album", "year", "track_number")
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeResult:
+    format: AllowedFormats
+    length: int  # exact duration in ms
+    sample_rate: int
+    channels: int
+    title: str | None = None
+    artist: str | None = None
+    album: str | None = None
+    year: int | None = None
+    track_number: int | None = None
+
+    @property
+    def tags(self) -> dict[str, Any]:
+        return {fld: getattr(self, fld) for fld in (*TAGS_FIELDS, "length")}
+
+
+def _parse_int(value: str | None) -> int | None:
+    """
+    Parse leading number of tags like "2004-05-01" or "3/12".
+    """
+    if value and (match := re.match(r"\s*(\d+)", value)):
+        return int(match.group(1))
+    return None
+
+
+def _make_tags(raw_tags: dict[str, str]) -> dict[str, Any]:
+    return {
+        "title": raw_tags.get("title"),
+        "artist": raw_tags.get("artist"),
+        "album": raw_tags.get("album"),
+        "year": _parse_int(raw_tags.get("year")),
+        "track_number": _parse_int(raw_tags.get("track_number")),
+    }
+
+
+# FLAC
+
+_VORBIS_FIELDS = {
+    "TITLE": "title",
+    "ARTIST": "artist",
+    "ALBUM": "album",
+    "DATE": "year",
+    "YEAR": "year",
+    "TRACKNUMBER": "track_number",
+}
+
+
+def _parse_vorbis_comments(data: bytes) -> dict[str, str]:
+    raw_tags: dict[str, str] = {}
+
+    vendor_length = int.from_bytes(data[0:4], "little")
+    position = 4 + vendor_length
+    comments_number = int.from_bytes(data[position : position + 4], "little")
+    position += 4
+
+    for _ in range(comments_number):
+        length = int.from_bytes(data[position : position + 4], "little")
+        position += 4
+        if position + length > len(data):  # truncated block
+            break
+        comment = data[position : position + length].decode("utf-8", "replace")
+        position += length
+
+        key, _, value = comment.partition("=")
+        if (fld := _VORBIS_FIELDS.get(key.upper())) and fld not in raw_tags:
+            raw_tags[fld] = value
+
+    return raw_tags
+
+
+def _probe_flac(file: BinaryIO) -> ProbeResult:
+    if file.read(4) != b"fLaC":
+        raise ProbeError("No FLAC stream marker")
+
+    stream_info, raw_tags = None, {}
+
+    is_last_block = False
+    while not is_last_block:
+        header = file.read(4)
+        if len(header) < 4:
+            raise ProbeError("Truncated FLAC metadata")
+
+        is_last_block = bool(header[0] & 0x80)
+        block_type = header[0] & 0x7F
+        block_length = int.from_bytes(header[1:4], "big")
+
+        match block_type:
+            case 0:  # STREAMINFO
+                stream_info = file.read(block_length)
+            case 4:  # VORBIS_COMMENT
+                raw_tags = _parse_vorbis_comments(file.read(block_length))
+            case _:  # pictures, seektables, paddings, etc.
+                file.seek(block_length, os.SEEK_CUR)
+
+    if stream_info is None or len(stream_info) < 18:
+        raise ProbeError("No FLAC STREAMINFO block")
+
+    # 20 bits of sample rate, 3 bits of channels, 5 bits of bps, 36 bits of samples
+    bits = int.from_bytes(stream_info[10:18], "big")
+    sample_rate = bits >> 44
+    channels = ((bits >> 41) & 0x7) + 1
+    total_samples = bits & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        raise ProbeError("Unknown FLAC stream length")
+
+    return ProbeResult(
+        format=AllowedFormats.FLAC,
+        length=total_samples * 1000 // sample_rate,
+        sample_rate=sample_rate,
+        channels=channels,
+        **_make_tags(raw_tags),
+    )
+
+
+# MP3
+
+_MP3_SEARCH_SIZE = 16 * 1024
+
+_ID3_FIELDS = {
+    "TIT2": "title",
+    "TT2": "title",
+    "TPE1": "artist",
+    "TP1": "artist",
+    "TALB": "album",
+    "TAL": "album",
+    "TDRC": "year",
+    "TYER": "year",
+    "TYE": "year",
+    "TRCK": "track_number",
+    "TRK": "track_number",
+}
+
+_ID3_ENCODINGS = ("latin-1", "utf-16", "utf-16-be", "utf-8")
+
+_MPEG_BITRATES = {  # (version, layer): kbps by index
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+_MPEG_SAMPLE_RATES = {
+    1: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    2.5: (11025, 12000, 8000),
+}
+
+
+def _syncsafe(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_id3_text(data: bytes) -> str | None:
+    if not data:
+        return None
+    encoding = _ID3_ENCODINGS[data[0]] if data[0] < len(_ID3_ENCODINGS) else "latin-1"
+    text = data[1:].decode(encoding, "replace")
+    return text.split("\x00")[0].strip() or None
+
+
+def _parse_id3v2(file: BinaryIO, version: int, end: int) -> dict[str, str]:
+    """
+    Parse text frames of the tag up to `end` offset,
+    skipping other frames (like cover arts) without reading them.
+    """
+    raw_tags: dict[str, str] = {}
+
+    id_length, header_length = (3, 6) if version == 2 else (4, 10)
+
+    while file.tell() + header_length <= end:
+        header = file.read(header_length)
+        frame_id = header[:id_length]
+        if not frame_id.isalnum():  # padding reached
+            break
+
+        size_bytes = header[id_length : id_length * 2]
+        if version == 4:
+            size = _syncsafe(size_bytes)
+        else:
+            size = int.from_bytes(size_bytes, "big")
+
+        fld = _ID3_FIELDS.get(frame_id.decode("latin-1"))
+        if fld and fld not in raw_tags:
+            if text := _decode_id3_text(file.read(size)):
+                raw_tags[fld] = text
+        else:
+            file.seek(size, os.SEEK_CUR)
+
+    return raw_tags
+
+
+def _read_id3v2(file: BinaryIO) -> tuple[dict[str, str], int]:
+    """
+    Returns tags of ID3v2 tag and the offset where audio data starts.
+    """
+    header = file.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        return {}, 0
+
+    version, flags = header[3], header[5]
+    size = _syncsafe(header[6:10])
+    audio_start = 10 + size + (10 if flags & 0x10 else 0)  # with footer
+
+    if flags & 0x40:  # extended header
+        ext_size = file.read(4)
+        if version == 3:
+            file.seek(int.from_bytes(ext_size, "big"), os.SEEK_CUR)
+        elif version == 4:
+            file.seek(_syncsafe(ext_size) - 4, os.SEEK_CUR)
+
+    if version <= 3 and flags & 0x80:  # unsynchronisation of the whole tag
+        data = file.read(10 + size - file.tell()).replace(b"\xff\x00", b"\xff")
+        return _parse_id3v2(BytesIO(data), version, end=len(data)), audio_start
+
+    return _parse_id3v2(file, version, end=10 + size), audio_start
+
+
+def _read_id3v1(file: BinaryIO) -> dict[str, str] | None:
+    """
+    Returns tags of ID3v1 tag at the end of file or None if there is no such tag.
+    """
+    file.seek(-128, os.SEEK_END)
+    data = file.read(128)
+    if data[:3] != b"TAG":
+        return None
+
+    def text(start: int, end: int) -> str | None:
+        return data[start:end].split(b"\x00")[0].decode("latin-1").strip() or None
+
+    raw_tags = {
+        "title": text(3, 33),
+        "artist": text(33, 63),
+        "album": text(63, 93),
+        "year": text(93, 97),
+    }
+    if data[125] == 0 and data[126]:  # ID3v1.1 track number
+        raw_tags["track_number"] = str(data[126])
+
+    return {k: v for k, v in raw_tags.items() if v}
+
+
+@dataclass(frozen=True, slots=True)
+class _MpegFrame:
+    version: float
+    layer: int
+    bitrate: int  # kbps
+    sample_rate: int
+    channels: int
+    padding: int
+
+    @property
+    def length(self) -> int:
+        """
+        Length of the frame in bytes.
+        """
+        slot_length = 4 if self.layer == 1 else 1
+        slots_number = (
+            self.samples_number // 8 * self.bitrate * 1000 // self.sample_rate
+        )
+        return slots_number + self.padding * slot_length
+
+    @property
+    def samples_number(self) -> int:
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and self.version != 1:
+            return 576
+        return 1152
+
+    @property
+    def side_info_length(self) -> int:
+        if self.version == 1:
+            return 17 if self.channels == 1 else 32
+        return 9 if self.channels == 1 else 17
+
+
+def _parse_mpeg_header(data: bytes) -> _MpegFrame | None:
+    if len(data) < 4:
+        return None
+    header = int.from_bytes(data[:4], "big")
+    if (header >> 21) & 0x7FF != 0x7FF:
+        return None
+
+    version = {0: 2.5, 2: 2, 3: 1}.get((header >> 19) & 0x3)
+    layer = {1: 3, 2: 2, 3: 1}.get((header >> 17) & 0x3)
+    bitrate_index = (header >> 12) & 0xF
+    sample_rate_index = (header >> 10) & 0x3
+    if None in (version, layer) or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = _MPEG_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = _MPEG_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header >> 9) & 0x1
+    channels = 1 if (header >> 6) & 0x3 == 3 else 2
+
+    return _MpegFrame(version, layer, bitrate, sample_rate, channels, padding)
+
+
+def _find_first_frame(data: bytes) -> tuple[int, _MpegFrame]:
+    position = data.find(b"\xff")
+    while position != -1:
+        frame = _parse_mpeg_header(data[position : position + 4])
+        if frame is not None:
+            next_position = position + frame.length
+            # check the next frame too, to not be fooled by random sync bits
+            if next_position + 4 > len(data) or _parse_mpeg_header(
+                data[next_position : next_position + 4]
+            ):
+                return position, frame
+        position = data.find(b"\xff", position + 1)
+
+    raise ProbeError("No MPEG frame found")
+
+
+def _vbr_samples_number(data: bytes, frame: _MpegFrame) -> int | None:
+    """
+    Number of samples from Xing/Info (with LAME gapless info) or VBRI header.
+    """
+    xing_offset = 4 + frame.side_info_length
+    if data[xing_offset : xing_offset + 4] in (b"Xing", b"Info"):
+        flags = int.from_bytes(data[xing_offset + 4 : xing_offset + 8], "big")
+        if not flags & 0x1:
+            return None
+
+        frames_number = int.from_bytes(data[xing_offset + 8 : xing_offset + 12], "big")
+        samples_number = frames_number * frame.samples_number
+
+        lame_offset = xing_offset + 12
+        lame_offset += 4 if flags & 0x2 else 0  # bytes
+        lame_offset += 100 if flags & 0x4 else 0  # table of contents
+        lame_offset += 4 if flags & 0x8 else 0  # quality
+        if data[lame_offset : lame_offset + 4] in (b"LAME", b"Lavf", b"Lavc"):
+            delays = int.from_bytes(data[lame_offset + 21 : lame_offset + 24], "big")
+            encoder_delay, padding = delays >> 12, delays & 0xFFF
+            samples_number -= encoder_delay + padding
+
+        return max(samples_number, 0)
+
+    vbri_offset = 4 + 32
+    if data[vbri_offset : vbri_offset + 4] == b"VBRI":
+        frames_number = int.from_bytes(data[vbri_offset + 14 : vbri_offset + 18], "big")
+        return frames_number * frame.samples_number
+
+    return None
+
+
+def _probe_mp3(file: BinaryIO) -> ProbeResult:
+    raw_tags, audio_start = _read_id3v2(file)
+
+    file.seek(audio_start)
+    data = file.read(_MP3_SEARCH_SIZE)
+    offset, frame = _find_first_frame(data)
+
+    file_size = file.seek(0, os.SEEK_END)
+    id3v1_tags = _read_id3v1(file) if file_size >= 128 else None
+    raw_tags = raw_tags or id3v1_tags or {}
+
+    samples_number = _vbr_samples_number(data[offset:], frame)
+    if samples_number is not None:
+        length = samples_number * 1000 // frame.sample_rate
+    else:  # constant bitrate
+        audio_size = file_size - audio_start - offset
+        if id3v1_tags is not None:
+            audio_size -= 128
+        length = audio_size * 8 // frame.bitrate
+
+    return ProbeResult(
+        format=AllowedFormats.MP3,
+        length=length,
+        sample_rate=frame.sample_rate,
+        channels=frame.channels,
+        **_make_tags(raw_tags),
+    )
+
+
+# WAV
+
+_INFO_FIELDS = {
+    b"INAM": "title",
+    b"IART": "artist",
+    b"IPRD": "album",
+    b"ICRD": "year",
+    b"ITRK": "track_number",
+    b"IPRT": "track_number",
+}
+
+
+def _parse_info_chunk(data: bytes) -> dict[str, str]:
+    raw_tags: dict[str, str] = {}
+
+    position = 4  # after "INFO"
+    while position + 8 <= len(data):
+        chunk_id = data[position : position + 4]
+        size = int.from_bytes(data[position + 4 : position + 8], "little")
+        value = data[position + 8 : position + 8 + size]
+        position += 8 + size + size % 2
+
+        if (fld := _INFO_FIELDS.get(chunk_id)) and fld not in raw_tags:
+            text = value.split(b"\x00")[0].decode("utf-8", "replace").strip()
+            if text:
+                raw_tags[fld] = text
+
+    return raw_tags
+
+
+def _probe_wav(file: BinaryIO) -> ProbeResult:
+    header = file.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ProbeError("No RIFF/WAVE header")
+
+    file_size = file.seek(0, os.SEEK_END)
+    file.seek(12)
+
+    fmt, data_size, raw_tags = None, None, {}
+    while (chunk_header := file.read(8)) and len(chunk_header) == 8:
+        chunk_id = chunk_header[:4]
+        size = int.from_bytes(chunk_header[4:], "little")
+
+        match chunk_id:
+            case b"fmt ":
+                fmt = file.read(size)
+            case b"data":
+                data_size = min(size, file_size - file.tell())
+                file.seek(data_size, os.SEEK_CUR)
+            case b"LIST":
+                payload = file.read(size)
+                if payload[:4] == b"INFO":
+                    raw_tags = _parse_info_chunk(payload)
+            case _:
+                file.seek(size, os.SEEK_CUR)
+
+        if size % 2:  # chunks are word-aligned
+            file.seek(1, os.SEEK_CUR)
+
+    if fmt is None or len(fmt) < 16 or data_size is None:
+        raise ProbeError("No fmt or data chunk in WAV")
+
+    channels = int.from_bytes(fmt[2:4], "little")
+    sample_rate = int.from_bytes(fmt[4:8], "little")
+    byte_rate = int.from_bytes(fmt[8:12], "little")
+    if not byte_rate:
+        raise ProbeError("Zero byte rate in WAV")
+
+    return ProbeResult(
+        format=AllowedFormats.WAV,
+        length=data_size * 1000 // byte_rate,
+        sample_rate=sample_rate,
+        channels=channels,
+        **_make_tags(raw_tags),
+    )
+
+
+_PROBES: dict[AllowedFormats, Callable[[BinaryIO], ProbeResult]] = {
+    AllowedFormats.FLAC: _probe_flac,
+    AllowedFormats.MP3: _probe_mp3,
+    AllowedFormats.WAV: _probe_wav,
+}
+
+
+def probe(path: str | Path, format_: AllowedFormats | None = None) -> ProbeResult:
+    """
+    Probe headers of the audiofile.
+    Raises ProbeError if headers are malformed or not informative enough.
+    """
+    format_ = format_ or AllowedFormats.from_path(path)
+
+    try:
+        with open(path, "rb") as file:
+            return _PROBES[format_](file)
+    except (IndexError, ValueError, OSError) as e:
+        raise ProbeError(f"Failed to probe {path}: {e}") from e
+
+
+def _read_tags_with_music_tag(path: str | Path) -> dict[str, Any]:
+    data = music_tag.load_file(path)
+
+    tags = {}
+    for fld in TAGS_FIELDS:
+        try:
+            altered_fld = fld.replace("_", "")
+            tags[fld] = data[altered_fld].values[0]
+        except (KeyError, IndexError):
+            tags[fld] = None
+
+    tags["length"] = round(float(data["#length"].values[0]) * 1000)
+
+    return tags
+
+
+def read_tags(
+    path: str | Path, format_: AllowedFormats | None = None
+) -> dict[str, Any]:
+    """
+    Read tags and exact length (in ms) of the audiofile.
+    Headers are probed natively, music_tag is a fallback for unusual files.
+    Missing tags are returned as None.
+    """
+    try:
+        return probe(path, format_).tags
+    except ProbeError:
+        return _read_tags_with_music_tag(path)
@@ -0,0 +1,178 @@
+import time
+from math import inf, log10
+from typing import Self
+
+import numpy as np
+
+from app.files.playback import PlaybackBackend, play_segment
+
+
+NORMALIZATION_HEADROOM = 0.1  # in dB, the same as in pydub.effects.normalize
+
+_MAX_AMPLITUDE = 2**15  # of signed 16-bit PCM
+
+
+def _to_dbfs(amplitude: float) -> float:
+    if amplitude == 0:
+        return -inf
+    return 20 * log10(amplitude / _MAX_AMPLITUDE)
+
+
+def gain_to_peak(peak: float, headroom: float = NORMALIZATION_HEADROOM) -> float:
+    """
+    Gain in dB which brings the `peak` in dBFS to `headroom` below
+    the maximum amplitude.
+    """
+    if peak == -inf:  # silence
+        return 0.0
+    return -headroom - peak
+
+
+def peak_gain(
+    *segments: "PlayableSegment", headroom: float = NORMALIZATION_HEADROOM
+) -> float:
+    """
+    Gain in dB which brings the loudest peak of all segments to `headroom` below
+    the maximum amplitude, so the same gain normalizes all parts of a song.
+    """
+    peak = max((segment.max_dBFS for segment in segments), default=-inf)
+    return gain_to_peak(peak, headroom)
+
+
+class PlayableSegment:
+    """
+    Signed 16-bit PCM held in a NumPy array of frames by channels.
+
+    The array can be a view of decoded bytes, of shared memory or of another
+    segment: slicing by milliseconds returns views, so PCM is copied only
+    by operations changing samples, such as gain, fades and downmix.
+    """
+
+    __slots__ = ("_samples", "frame_rate")
+
+    sample_width = 2  # bytes
+
+    def __init__(self, samples: np.ndarray, frame_rate: int) -> None:
+        self._samples = samples
+        self.frame_rate = frame_rate
+
+    @classmethod
+    def from_pcm(cls, data: bytes | memoryview, frame_rate: int, channels: int) -> Self:
+        """
+        Segment over raw interleaved PCM, the data is not copied.
+        """
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, channels)
+        return cls(samples, frame_rate)
+
+    @property
+    def samples(self) -> np.ndarray:
+        return self._samples
+
+    @property
+    def channels(self) -> int:
+        return self._samples.shape[1]
+
+    @property
+    def frame_width(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def frames(self) -> int:
+        return self._samples.shape[0]
+
+    @property
+    def raw_data(self) -> memoryview:
+        """
+        Interleaved PCM, copied only if the array is not contiguous.
+        """
+        samples = np.ascontiguousarray(self._samples)
+        return samples.reshape(-1).view(np.uint8).data
+
+    def __len__(self) -> int:  # in ms, as in pydub
+        return round(self.frames * 1000 / self.frame_rate)
+
+    def _frame(self, position: int | None, default: int) -> int:
+        if position is None:
+            return default
+        if position < 0:
+            position += len(self)
+        return min(max(int(position * self.frame_rate / 1000), 0), self.frames)
+
+    def __getitem__(self, key: slice) -> Self:
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("Segments are sliced only by ranges of milliseconds")
+
+        start = self._frame(key.start, 0)
+        stop = self._frame(key.stop, self.frames)
+        return type(self)(self._samples[start:stop], self.frame_rate)
+
+    @property
+    def peak(self) -> int:
+        if not self.frames:
+            return 0
+        return max(int(self._samples.max()), -int(self._samples.min()))
+
+    @property
+    def rms(self) -> float:
+        if not self.frames:
+            return 0.0
+        return float(np.sqrt(np.mean(np.square(self._samples, dtype=np.float64))))
+
+    @property
+    def max_dBFS(self) -> float:
+        return _to_dbfs(self.peak)
+
+    @property
+    def dBFS(self) -> float:
+        return _to_dbfs(self.rms)
+
+    def _scaled(self, factors: np.ndarray | float) -> Self:
+        scaled = np.multiply(self._samples, factors, dtype=np.float32)
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, -_MAX_AMPLITUDE, _MAX_AMPLITUDE - 1, out=scaled)
+        return type(self)(scaled.astype(np.int16), self.frame_rate)
+
+    def apply_gain(self, gain: float) -> Self:
+        """
+        Amplify by `gain` in dB, clipping samples to the maximum amplitude.
+        """
+        if gain == 0:
+            return self
+        return self._scaled(10 ** (gain / 20))
+
+    def _fade(self, duration: int, fade_in: bool) -> Self:
+        length = self._frame(duration, 0)
+        ramp = np.ones(self.frames, dtype=np.float32)
+        steps = np.linspace(0, 1, length, endpoint=False)
+        if fade_in:
+            ramp[:length] = steps
+        else:
+            ramp[self.frames - length :] = steps[::-1]
+        return self._scaled(ramp[:, np.newaxis])
+
+    def fade_in(self, duration: int) -> Self:
+        """
+        Raise amplitude linearly from silence over the first `duration` ms.
+        """
+        return self._fade(duration, fade_in=True)
+
+    def fade_out(self, duration: int) -> Self:
+        """
+        Lower amplitude linearly to silence over the last `duration` ms.
+        """
+        return self._fade(duration, fade_in=False)
+
+    def to_mono(self) -> Self:
+        """
+        Downmix channels by averaging them.
+        """
+        if self.channels == 1:
+            return self
+        mixed = np.mean(self._samples, axis=1, dtype=np.float32, keepdims=True)
+        return type(self)(np.rint(mixed).astype(np.int16), self.frame_rate)
+
+    def play(
+        self, start: int = 0, backend: PlaybackBackend = PlaybackBackend.SIMPLEAUDIO
+    ) -> None:
+        requested_at = time.perf_counter()
+        play_segment(self[start:], backend=backend, requested_at=requested_at)
@@ -0,0 +1,279 @@
+import logging
+import multiprocessing
+import time
+from math import inf
+from dataclasses import dataclass
+from enum import StrEnum, auto
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from typing import Generator
+
+from app.exceptions import SongRouletteError
+from app.files.cache import SegmentsLRU
+from app.files.decoding import decode_full, PcmFormat, SAMPLE_WIDTH, stream_segments
+from app.files.formats import AllowedFormats
+from app.files.playback import Playback, PlaybackBackend, start_playback, start_stream
+from app.files.segments import NORMALIZATION_HEADROOM, peak_gain, PlayableSegment
+
+
+logger = logging.getLogger(__name__)
+
+_STATUS_TIMEOUT = 5.0  # in seconds
+_QUIT_TIMEOUT = 1.0  # in seconds
+
+# the service is spawned, not forked: it can be restarted while the game runs
+# threads of the preparation pool, and a forked child may deadlock on their locks
+_CONTEXT = multiprocessing.get_context("spawn")
+
+
+class PlayerCommand(StrEnum):
+    PLAY = auto()
+    SEEK = auto()
+    STOP = auto()
+    STATUS = auto()
+    QUIT = auto()
+
+
+@dataclass(frozen=True, slots=True)
+class TrackReference:
+    """
+    Audiofile to play. It is decoded by the service itself,
+    so no audio is sent between processes.
+    Decoded tracks are normalized by their own peak, streamed ones
+    are amplified by `gain` (in dB), as their peak is not known in advance,
+    but never above the gain which keeps the loudest part played so far unclipped.
+    """
+
+    path: str
+    format: AllowedFormats | None = None
+    gain: float = 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerStatus:
+    track: TrackReference | None
+    is_playing: bool
+    position: int  # in ms
+
+
+class _Player:
+    """
+    State of the service process: decoded tracks and the current playback.
+    """
+
+    __slots__ = (
+        "_backend",
+        "_stream",
+        "_pcm_format",
+        "_tracks",
+        "_track",
+        "_playback",
+        "_offset",
+        "_started_at",
+    )
+
+    def __init__(
+        self,
+        backend: PlaybackBackend,
+        memory: int,
+        stream: bool,
+        pcm_format: PcmFormat,
+    ) -> None:
+        self._backend = backend
+        self._stream = stream
+        self._pcm_format = pcm_format
+        self._tracks = SegmentsLRU(max_size=memory)
+        self._track: TrackReference | None = None
+        self._playback: Playback | None = None
+        self._offset = 0  # position the playback was started from, in ms
+        self._started_at = 0.0
+
+    def _load(self, track: TrackReference) -> PlayableSegment:
+        if (audio := self._tracks.get(track)) is None:
+            audio = decode_full(track.path, track.format, self._pcm_format)
+            audio = audio.apply_gain(peak_gain(audio))
+            self._tracks.put(track, audio)
+        return audio
+
+    @property
+    def is_playing(self) -> bool:
+        return self._playback is not None and self._playback.is_playing()
+
+    @property
+    def position(self) -> int:
+        if not self.is_playing:
+            return self._offset
+        return self._offset + int((time.perf_counter() - self._started_at) * 1000)
+
+    def _start_stream(
+        self, track: TrackReference, start: int, requested_at: float
+    ) -> Playback:
+        chunks = stream_segments(track.path, start, self._pcm_format)
+        return start_stream(
+            _with_gain(chunks, track.gain),
+            sample_rate=self._pcm_format.sample_rate,
+            channels=self._pcm_format.channels,
+            sample_width=SAMPLE_WIDTH,
+            requested_at=requested_at,
+        )
+
+    def play(self, track: TrackReference, start: int, requested_at: float) -> None:
+        self.stop()
+        if self._stream:
+            self._playback = self._start_stream(track, start, requested_at)
+        else:
+            audio = self._load(track)
+            self._playback = start_playback(audio[start:], self._backend, requested_at)
+        self._track, self._offset = track, start
+        self._started_at = time.perf_counter()
+
+    def seek(self, position: int, requested_at: float) -> None:
+        if self._track is not None:
+            self.play(self._track, position, requested_at)
+
+    def stop(self) -> None:
+        if self._playback is not None:
+            self._offset = self.position
+            self._playback.stop()
+            self._playback = None
+
+    def status(self) -> PlayerStatus:
+        return PlayerStatus(
+            track=self._track, is_playing=self.is_playing, position=self.position
+        )
+
+
+def _with_gain(
+    chunks: Generator[PlayableSegment, None, None], gain: float
+) -> Generator[PlayableSegment, None, None]:
+    """
+    Amplify chunks by `gain` in dB, limited by the loudest chunk so far,
+    so peaks louder than the samples the gain was found by are not clipped.
+    The limit is never raised back, so the volume does not pump.
+    """
+    limit = inf
+    try:
+        for chunk in chunks:
+            if (peak := chunk.max_dBFS) != -inf:
+                limit = min(limit, -NORMALIZATION_HEADROOM - peak)
+            yield chunk.apply_gain(min(gain, limit))
+    finally:
+        chunks.close()
+
+
+def _serve(
+    commands: Queue,
+    statuses: Queue,
+    backend: PlaybackBackend,
+    memory: int,
+    stream: bool,
+    pcm_format: PcmFormat,
+) -> None:
+    import signal
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # interrupts are handled by the UI
+
+    player = _Player(backend, memory, stream, pcm_format)
+    while True:
+        command, args = commands.get()
+        try:
+            match command:
+                case PlayerCommand.PLAY:
+                    player.play(*args)
+                case PlayerCommand.SEEK:
+                    player.seek(*args)
+                case PlayerCommand.STOP:
+                    player.stop()
+                case PlayerCommand.STATUS:
+                    statuses.put(player.status())
+                case PlayerCommand.QUIT:
+                    player.stop()
+                    return
+        except SongRouletteError as e:
+            logger.error("Failed to %s: %s", command, e)
+
+
+class AudioService:
+    """
+    Long-lived process playing full tracks, controlled through a queue
+    of commands, so starting and stopping playback does not start processes.
+    Tracks are streamed from files if `stream` is set, otherwise they are
+    decoded in full and kept in memory of the process up to `memory` bytes.
+    Tracks are decoded to `pcm_format` whatever the format of their files is.
+    Start time of playback is measured from the moment a command is sent.
+    """
+
+    __slots__ = (
+        "_backend",
+        "_memory",
+        "_stream",
+        "_pcm_format",
+        "_commands",
+        "_statuses",
+        "_process",
+    )
+
+    def __init__(
+        self,
+        backend: PlaybackBackend,
+        memory: int,
+        stream: bool,
+        pcm_format: PcmFormat,
+    ) -> None:
+        self._backend = backend
+        self._memory = memory  # in bytes
+        self._stream = stream
+        self._pcm_format = pcm_format
+        self._commands: Queue | None = None
+        self._statuses: Queue | None = None
+        self._process: BaseProcess | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+
+        self._commands, self._statuses = _CONTEXT.Queue(), _CONTEXT.Queue()
+        self._process = _CONTEXT.Process(
+            target=_serve,
+            args=(
+                self._commands,
+                self._statuses,
+                self._backend,
+                self._memory,
+                self._stream,
+                self._pcm_format,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+
+    def _send(self, command: PlayerCommand, *args) -> None:
+        self.start()
+        self._commands.put((command, args))
+
+    def play(self, track: TrackReference, start: int = 0) -> None:
+        self._send(PlayerCommand.PLAY, track, start, time.perf_counter())
+
+    def seek(self, position: int) -> None:
+        self._send(PlayerCommand.SEEK, position, time.perf_counter())
+
+    def stop(self) -> None:
+        self._send(PlayerCommand.STOP)
+
+    def status(self) -> PlayerStatus:
+        self._send(PlayerCommand.STATUS)
+        return self._statuses.get(timeout=_STATUS_TIMEOUT)
+
+    def close(self) -> None:
+        if not self.is_running:
+            return
+
+        self._commands.put((PlayerCommand.QUIT, ()))
+        self._process.join(timeout=_QUIT_TIMEOUT)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
@@ -0,0 +1,114 @@
+from collections import Counter
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Sequence
+
+from app.files.segments import PlayableSegment
+
+
+@dataclass(frozen=True, slots=True)
+class PcmHandle:
+    """
+    Reference to PCM in a block of shared memory, cheap to send between processes.
+    """
+
+    name: str  # of the block
+    offset: int  # in bytes
+    frames: int
+    sample_rate: int
+    channels: int
+    sample_width: int
+
+    @property
+    def size(self) -> int:
+        return self.frames * self.channels * self.sample_width
+
+
+def share_pcm(segments: Sequence[PlayableSegment]) -> list[PcmHandle]:
+    """
+    Copy PCM of segments into one new block of shared memory.
+    The block outlives this process until it is unlinked by its owner.
+    """
+    size = sum(len(segment.raw_data) for segment in segments)
+    block = SharedMemory(create=True, size=max(size, 1))
+    # handed over to the process which acquires or unlinks it,
+    # so the tracker of this one does not unlink it when this process exits
+    resource_tracker.unregister(block._name, "shared_memory")
+
+    handles, offset = [], 0
+    for segment in segments:
+        data = segment.raw_data
+        block.buf[offset : offset + len(data)] = data
+        handles.append(
+            PcmHandle(
+                name=block.name,
+                offset=offset,
+                frames=len(data) // segment.frame_width,
+                sample_rate=segment.frame_rate,
+                channels=segment.channels,
+                sample_width=segment.sample_width,
+            )
+        )
+        offset += len(data)
+
+    block.close()
+    return handles
+
+
+def unlink_block(name: str) -> None:
+    """
+    Free a block which is not owned by anyone, e.g. of discarded results.
+    """
+    try:
+        block = SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+class SharedPcmBlocks:
+    """
+    Blocks of shared memory with PCM prepared by other processes, owned by this one.
+
+    Blocks are counted by references and unlinked when no reference is left.
+    Segments are views of blocks, so PCM is not copied into this process.
+    Acquired blocks are registered with the resource tracker of this process
+    only, so they are unlinked by it if the process dies without releasing them.
+    """
+
+    __slots__ = ("_blocks", "_references")
+
+    def __init__(self) -> None:
+        # child processes share the tracker, so their blocks outlive them
+        resource_tracker.ensure_running()
+
+        self._blocks: dict[str, SharedMemory] = {}
+        self._references: Counter[str] = Counter()
+
+    def acquire(self, name: str) -> None:
+        if name not in self._blocks:
+            self._blocks[name] = SharedMemory(name=name)
+        self._references[name] += 1
+
+    def release(self, name: str) -> None:
+        self._references[name] -= 1
+        if self._references[name] > 0:
+            return
+
+        del self._references[name]
+        block = self._blocks.pop(name)
+        try:
+            block.close()
+        except BufferError:  # still played, the mapping is kept until it ends
+            pass
+        block.unlink()
+
+    def segment(self, handle: PcmHandle) -> PlayableSegment:
+        block = self._blocks[handle.name]
+        return PlayableSegment.from_pcm(
+            block.buf[handle.offset : handle.offset + handle.size],
+            frame_rate=handle.sample_rate,
+            channels=handle.channels,
+        )
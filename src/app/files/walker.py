@@ -0,0 +1,264 @@
+import os
+import time
+from dataclasses import dataclass, replace
+from fnmatch import fnmatch
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, TypeAlias
+
+from app.files.formats import detect_format
+
+
+IGNORE_FILE_NAME = ".songignore"
+
+
+@dataclass(frozen=True, slots=True)
+class WalkProgress:
+    dirs_visited: int
+    dirs_pending: int
+    files_seen: int
+    candidates_found: int
+    seconds: float
+    is_finished: bool = False
+
+    @property
+    def files_per_second(self) -> float:
+        if not self.seconds:
+            return float(self.files_seen)
+        return self.files_seen / self.seconds
+
+    @property
+    def eta(self) -> float:
+        """
+        Rough estimate of seconds left,
+        assuming pending directories are as large as visited ones.
+        """
+        if not self.dirs_visited:
+            return 0.0
+        return self.seconds / self.dirs_visited * self.dirs_pending
+
+    def __str__(self):
+        progress = (
+            f"{self.dirs_visited} dirs visited, "
+            f"{self.candidates_found} audiofiles found, "
+            f"{self.files_per_second:.0f} files/sec"
+        )
+        if self.is_finished:
+            return f"{progress}, done in {self.seconds:.1f} s"
+        return f"{progress}, ETA {self.eta:.0f} s"
+
+
+ProgressCallback: TypeAlias = Callable[[WalkProgress], None]
+
+
+@dataclass(frozen=True, slots=True)
+class _IgnorePattern:
+    base: str
+    pattern: str
+    only_dirs: bool
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        if self.only_dirs and not is_dir:
+            return False
+        name, relative_path = os.path.basename(path), os.path.relpath(path, self.base)
+        return fnmatch(name, self.pattern) or fnmatch(relative_path, self.pattern)
+
+
+def _read_ignore_file(dir_path: str, file_name: str) -> list[_IgnorePattern]:
+    patterns = []
+    try:
+        with open(os.path.join(dir_path, file_name), encoding="utf-8") as file:
+            for line in file:
+                if not (line := line.strip()) or line.startswith("#"):
+                    continue
+                patterns.append(
+                    _IgnorePattern(
+                        base=dir_path,
+                        pattern=line.rstrip("/"),
+                        only_dirs=line.endswith("/"),
+                    )
+                )
+    except OSError:
+        pass
+    return patterns
+
+
+def _is_audio_candidate(entry: os.DirEntry) -> bool:
+    return detect_format(entry.path) is not None
+
+
+class LibraryWalker:
+    """
+    Streaming walker over a library tree built on os.scandir.
+
+    Yields entries of accepted files as soon as they are found.
+    Hidden files and directories and globs listed in `.songignore` files
+    (applied to the directory with the file and all its subdirectories)
+    are pruned. Directories are identified by (device, inode),
+    so symlink loops are not followed, and hardlinked or symlinked
+    files are yielded only once.
+    """
+
+    __slots__ = (
+        "_root",
+        "_accept",
+        "_skip_hidden",
+        "_ignore_file_name",
+        "_on_progress",
+        "_progress_interval",
+    )
+
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        accept: Callable[[os.DirEntry], bool] = _is_audio_candidate,
+        skip_hidden: bool = True,
+        ignore_file_name: str = IGNORE_FILE_NAME,
+        on_progress: ProgressCallback | None = None,
+        progress_interval: float = 0.5,
+    ) -> None:
+        self._root = os.path.abspath(root)
+        self._accept = accept
+        self._skip_hidden = skip_hidden
+        self._ignore_file_name = ignore_file_name
+        self._on_progress = on_progress
+        self._progress_interval = progress_interval
+
+    @staticmethod
+    def _key(stat: os.stat_result) -> tuple[int, int] | None:
+        if not stat.st_ino:  # some file systems do not provide inodes
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def __iter__(self) -> Iterator[os.DirEntry]:
+        start_time = last_report_time = time.perf_counter()
+        dirs_visited = files_seen = candidates_found = 0
+
+        visited_dirs = {self._key(os.stat(self._root))}
+        yielded_files: set[tuple[int, int]] = set()
+
+        stack: list[tuple[str, list[_IgnorePattern]]] = [(self._root, [])]
+
+        def progress(is_finished: bool = False) -> WalkProgress:
+            return WalkProgress(
+                dirs_visited=dirs_visited,
+                dirs_pending=len(stack),
+                files_seen=files_seen,
+                candidates_found=candidates_found,
+                seconds=time.perf_counter() - start_time,
+                is_finished=is_finished,
+            )
+
+        while stack:
+            dir_path, patterns = stack.pop()
+            try:
+                with os.scandir(dir_path) as iterator:
+                    entries = list(iterator)
+            except OSError:
+                continue
+            dirs_visited += 1
+
+            if any(entry.name == self._ignore_file_name for entry in entries):
+                patterns = patterns + _read_ignore_file(
+                    dir_path, self._ignore_file_name
+                )
+
+            for entry in entries:
+                if self._skip_hidden and entry.name.startswith("."):
+                    continue
+
+                try:
+                    is_dir = entry.is_dir()
+                    if any(p.matches(entry.path, is_dir) for p in patterns):
+                        continue
+
+                    if is_dir:
+                        key = self._key(entry.stat())
+                        if key is not None and key in visited_dirs:
+                            continue  # symlink loop or the same directory twice
+                        visited_dirs.add(key)
+                        stack.append((entry.path, patterns))
+                        continue
+
+                    if not entry.is_file():
+                        continue
+                    files_seen += 1
+                    if not self._accept(entry):
+                        continue
+
+                    # every file is checked, as the target of a symlink is
+                    # an ordinary file with one link
+                    key = self._key(entry.stat())
+                    if key is not None:
+                        if key in yielded_files:
+                            continue  # hardlink or symlink to the same file
+                        yielded_files.add(key)
+                except OSError:
+                    continue
+
+                candidates_found += 1
+                yield entry
+
+            now = time.perf_counter()
+            if self._on_progress and now - last_report_time > self._progress_interval:
+                self._on_progress(progress())
+                last_report_time = now
+
+        if self._on_progress:
+            self._on_progress(progress(is_finished=True))
+
+
+def is_walked(
+    root: str | Path,
+    path: str | Path,
+    *,
+    skip_hidden: bool = True,
+    ignore_file_name: str = IGNORE_FILE_NAME,
+) -> bool:
+    """
+    Check if the walker of `root` reaches the directory `path` nested in it,
+    that is no directory on the way to it is hidden or ignored.
+    """
+    dir_path, path = os.path.abspath(root), os.path.abspath(path)
+    patterns: list[_IgnorePattern] = []
+    for name in Path(os.path.relpath(path, dir_path)).parts:
+        patterns += _read_ignore_file(dir_path, ignore_file_name)
+        dir_path = os.path.join(dir_path, name)
+        if skip_hidden and name.startswith("."):
+            return False
+        if any(p.matches(dir_path, is_dir=True) for p in patterns):
+            return False
+    return True
+
+
+@lru_cache(maxsize=128)
+def _contains_audiofiles(
+    path: str, mtime_ns: int, on_progress: ProgressCallback | None
+) -> bool:
+    if on_progress is None:
+        return next(iter(LibraryWalker(path)), None) is not None
+
+    reports: list[WalkProgress] = []
+
+    def report(progress: WalkProgress) -> None:
+        reports.append(progress)
+        on_progress(progress)
+
+    is_found = next(iter(LibraryWalker(path, on_progress=report)), None) is not None
+    if reports and not reports[-1].is_finished:  # the walk was stopped early
+        on_progress(replace(reports[-1], is_finished=True))
+    return is_found
+
+
+def contains_audiofiles(
+    path: str | Path, on_progress: ProgressCallback | None = None
+) -> bool:
+    """
+    Check if there is at least one supported audiofile in the folder.
+    Walking stops at the first found audiofile, results are cached
+    by the path and modification time of the folder.
+    Progress of the walk is reported to `on_progress`.
+    """
+    path = os.path.abspath(path)
+    return _contains_audiofiles(path, os.stat(path).st_mtime_ns, on_progress)
@@ -0,0 +1,112 @@
+import json
+import os
+from dataclasses import dataclass
+from enum import StrEnum, auto
+from pathlib import Path
+from typing import Any, Self
+
+
+class JournalEvent(StrEnum):
+    SONG_TAKEN = auto()
+    TURN_STARTED = auto()
+    SAMPLE_PLAYED = auto()
+    CLUE_USED = auto()
+    ANSWER_GIVEN = auto()
+    EVALUATED = auto()
+
+
+class FsyncPolicy(StrEnum):
+    ALWAYS = auto()  # after every event
+    TURN = auto()  # after events finishing a turn
+    NEVER = auto()  # leave it to the OS
+
+
+_TURN_EVENTS = frozenset({JournalEvent.EVALUATED, JournalEvent.TURN_STARTED})
+
+
+@dataclass(frozen=True, slots=True)
+class JournalEntry:
+    number: int
+    event: JournalEvent
+    data: dict[str, Any]
+
+    @classmethod
+    def from_line(cls, line: str) -> Self:
+        entry = json.loads(line)
+        return cls(
+            number=entry["number"],
+            event=JournalEvent(entry["event"]),
+            data=entry["data"],
+        )
+
+    def to_line(self) -> str:
+        entry = {"number": self.number, "event": self.event, "data": self.data}
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class GameJournal:
+    """
+    Append-only journal of game events, one JSON line per event.
+
+    Entries are numbered through the whole game, so a snapshot stores
+    the number of the last entry it includes and only later entries are replayed.
+    The journal is truncated after each snapshot.
+    """
+
+    __slots__ = ("_file", "_fsync", "_number")
+
+    def __init__(self, path: str | Path, fsync: FsyncPolicy, number: int = 0) -> None:
+        self._file = open(path, "a", encoding="utf-8")
+        self._fsync = fsync
+        self._number = number  # of the last recorded entry
+
+    @property
+    def number(self) -> int:
+        return self._number
+
+    def record(self, event: JournalEvent, **data: Any) -> JournalEntry:
+        self._number += 1
+        entry = JournalEntry(number=self._number, event=event, data=data)
+
+        self._file.write(entry.to_line())
+        self._file.flush()
+        if self._fsync == FsyncPolicy.ALWAYS or (
+            self._fsync == FsyncPolicy.TURN and event in _TURN_EVENTS
+        ):
+            os.fsync(self._file.fileno())
+
+        return entry
+
+    def truncate(self) -> None:
+        self._file.truncate(0)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_journal(path: str | Path, after: int = 0) -> list[JournalEntry]:
+    """
+    Entries recorded after the entry number `after`.
+    Reading stops at a broken line, as it can be left only by a crash
+    in the middle of the last write.
+    """
+    entries = []
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = JournalEntry.from_line(line)
+                except (KeyError, ValueError):
+                    break
+                if entry.number > after:
+                    entries.append(entry)
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def delete_journal(path: str | Path) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,26 +1,72 @@
-import pickle
-from dataclasses import dataclass, field
+import collections
+import logging
+import multiprocessing
+import os
+import random
+import weakref
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
 from enum import StrEnum, auto
-from multiprocessing import Process
+from itertools import batched
 from pathlib import Path
-from typing import Generator, Self
-
-import music_tag
-from pydub import effects
+from typing import Any, Generator, Iterable, Iterator, Self, Sequence
 
 from app.cli.formatters import bold, TemplateString
-from app.files import (
-    AllowedFormats,
-    get_audiofiles_paths,
-    PlayableSegment,
-    player_worker,
+from app.cli.viewers import ProgressViewer
+from app.exceptions import (
+    InvalidPackFileError,
+    NotEnoughSongsError,
+    PreparationError,
+    SongRouletteError,
+)
+from app.files.cache import content_hash, open_sample_cache, SampleCache
+from app.files.decoding import (
+    decode_peak,
+    decode_windows,
+    DEFAULT_CHANNELS,
+    DEFAULT_SAMPLE_RATE,
+    PcmFormat,
+    Window,
+)
+from app.files.formats import AllowedFormats
+from app.files.playback import PlaybackBackend
+from app.files.probe import read_tags
+from app.files.segments import gain_to_peak, PlayableSegment
+from app.files.service import AudioService, TrackReference
+from app.files.shared import PcmHandle, share_pcm, SharedPcmBlocks, unlink_block
+from app.files.walker import is_walked
+from app.game.journal import (
+    delete_journal,
+    FsyncPolicy,
+    GameJournal,
+    JournalEvent,
+    read_journal,
+)
+from app.game.preparation import PreparationMetrics, PreparationPipeline
+from app.game.representations import LibraryStats, Score, ScoreItem
+from app.game.saves import (
+    AnswerSave,
+    delete_save,
+    GameSave,
+    PlayerSave,
+    read_save,
+    SongSave,
+    write_save,
 )
-from app.game.representations import Score, ScoreItem
 from app.game.selection import SONGS_STRATEGIES_MAPPING, SAMPLES_STRATEGIES_MAPPING
+from app.library.index import LibraryIndex
+from app.library.loaders import ParallelLoader
+from app.library.pack import build_pack, PackReport, ProxyPack
+from app.library.records import TrackRecord
+from app.library.registry import LibraryRegistry, LibraryView
 from app.settings.models import get_settings
 from app.utils import Counter, get_singleton_instance
 
 
+logger = logging.getLogger(__name__)
+
+
 @dataclass(frozen=True, slots=True)
 class Metadata:
     title: str
@@ -31,45 +77,237 @@ class Metadata:
     length: int
 
     @classmethod
-    def from_path(cls, path: Path) -> Self:
-        data = music_tag.load_file(path)
+    def from_path(cls, path: Path, format_: AllowedFormats | None = None) -> Self:
+        return cls(**read_tags(path, format_))
 
-        metadata = {}
-        for fld in cls.__annotations__.keys():
-            try:
-                altered_fld = fld.replace("_", "")
-                metadata[fld] = data[altered_fld].values[0]
-            except (KeyError, IndexError):
-                metadata[fld] = None
+    def __str__(self):
+        return (
+            f"{self.artist} — {bold(str(self.year))} — "
+            f"{self.album} — {bold(str(self.title))}"
+        )
 
-        metadata["length"] = (int(data["#length"].values[0]) - 5) * 1000
 
-        return cls(**metadata)
+def get_playback_backend() -> PlaybackBackend:
+    return PlaybackBackend(get_settings().audio.playback_backend)
 
-    def __str__(self):
-        return f"{self.artist} — {bold(str(self.year))} — {self.album} — {bold(self.title)}"
+
+def get_samples_format() -> PcmFormat:
+    """
+    Format all samples are decoded to, whatever the format of their files is.
+    """
+    audio_settings = get_settings().audio
+    return PcmFormat(
+        sample_rate=audio_settings.sample_rate,
+        channels=1 if audio_settings.mono_samples else DEFAULT_CHANNELS,
+    )
+
+
+def get_shared_blocks() -> SharedPcmBlocks:
+    return get_singleton_instance(SharedPcmBlocks)
+
+
+def _workers_context() -> multiprocessing.context.BaseContext:
+    """
+    Workers are not forked from the game: threads of the previous pool
+    may still be finishing, and a forked child may deadlock on their locks.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])  # imported once, not by every worker
+    return context
 
 
 class Sample:
     start_time: int
-    sample: PlayableSegment
+    pcm: PcmHandle | None
     times_played: int
 
-    __slots__ = ("start_time", "sample", "times_played")
+    __slots__ = ("start_time", "pcm", "times_played")
 
-    def __init__(self, start_time: int, full_audio: PlayableSegment):
-        normalized_audio = effects.normalize(full_audio)
-        length = get_settings().game.sample_duration
-        self.sample = normalized_audio[start_time : start_time + length * 1000]
+    def __init__(self, start_time: int, pcm: PcmHandle | None = None):
+        self.pcm = pcm  # normalized with the gain of the song, None until loaded
 
         self.start_time = start_time
         self.times_played = 0
 
     def play(self):
-        self.sample.play()
+        sample = get_shared_blocks().segment(self.pcm)
+        sample.play(backend=get_playback_backend())
         self.times_played += 1
 
 
+@dataclass(frozen=True, slots=True)
+class SamplingParams:
+    """
+    Snapshot of settings used to cut samples out of a song,
+    so songs prepared in other processes do not depend on their settings.
+    """
+
+    strategy: str
+    duration: int  # all times in ms
+    distance: int
+    quantity: int
+    start: int
+    end_cut: int
+    sample_rate: int = DEFAULT_SAMPLE_RATE
+    channels: int = DEFAULT_CHANNELS
+
+    @property
+    def pcm_format(self) -> PcmFormat:
+        return PcmFormat(sample_rate=self.sample_rate, channels=self.channels)
+
+    @classmethod
+    def from_settings(cls) -> Self:
+        settings, samples_format = get_settings(), get_samples_format()
+        return cls(
+            strategy=settings.sampling.strategy,
+            duration=int(settings.game.sample_duration * 1000),
+            distance=int(settings.sampling.distance * 1000),
+            quantity=settings.sampling.clues_quantity + 1,
+            start=int(settings.sampling.from_ * 1000),
+            end_cut=int(settings.sampling.to_finish * 1000),
+            sample_rate=samples_format.sample_rate,
+            channels=samples_format.channels,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PreparedSong:
+    """
+    Compact result of preparing a song: its normalized samples are left
+    in shared memory, only handles of them are sent between processes.
+    """
+
+    path: Path
+    format: AllowedFormats
+    metadata: Metadata
+    gain: float
+    sample_duration: int  # in ms
+    start_times: list[int]
+    samples: list[PcmHandle]
+
+
+def get_sample_cache() -> SampleCache | None:
+    service_paths = get_settings().service_paths
+    if not service_paths.sample_cache_size:
+        return None
+    return open_sample_cache(
+        service_paths.sample_cache_path,
+        max_size=service_paths.sample_cache_size * 2**20,
+    )
+
+
+def get_proxy_pack() -> ProxyPack | None:
+    settings = get_settings()
+    if not settings.audio.use_proxy_pack:
+        return None
+
+    pack = ProxyPack(settings.service_paths.proxy_pack_path)
+    try:
+        pack.pcm_format  # the file is checked here, not in every worker
+    except InvalidPackFileError as e:
+        logger.warning("Proxy pack is not used: %s", e)
+        return None
+    return pack
+
+
+def decode_samples(
+    path: Path,
+    format_: AllowedFormats,
+    windows: list[Window],
+    pcm_format: PcmFormat,
+    cache: SampleCache | None = None,
+    pack: ProxyPack | None = None,
+    file_hash: str | None = None,
+) -> list[PlayableSegment]:
+    """
+    Slice windows out of the proxy pack if the file is packed, decode them otherwise.
+    `file_hash` is the content hash of the file if it is already known.
+    """
+    if pack is not None:
+        samples = pack.windows(path, windows, pcm_format, file_hash=file_hash)
+        if samples is not None:
+            return samples
+    return decode_windows(
+        path,
+        windows,
+        format_,
+        pcm_format=pcm_format,
+        cache=cache,
+        file_hash=file_hash,
+    )
+
+
+def track_peak(
+    path: Path,
+    format_: AllowedFormats,
+    pcm_format: PcmFormat,
+    cache: SampleCache | None = None,
+    pack: ProxyPack | None = None,
+    file_hash: str | None = None,
+) -> float:
+    """
+    Peak of the whole track in dBFS, taken from the proxy pack if the file
+    is packed, decoded once and kept in the samples cache otherwise.
+    """
+    if pack is not None:
+        file_hash = file_hash or content_hash(path)
+        if (peak := pack.peak(file_hash)) is not None:
+            return peak
+    return decode_peak(path, format_, pcm_format, cache=cache, file_hash=file_hash)
+
+
+def prepare_song(
+    path: Path,
+    format_: AllowedFormats,
+    metadata: Metadata,
+    params: SamplingParams,
+    seed: int | None = None,
+    cache: SampleCache | None = None,
+    pack: ProxyPack | None = None,
+    file_hash: str | None = None,
+) -> PreparedSong:
+    """
+    Choose start times of samples, decode them and normalize them
+    by the peak of the whole track, so the song sounds as loud in every sample.
+    Given the same seed, the same samples are chosen.
+    """
+    samples_strategy = SAMPLES_STRATEGIES_MAPPING[params.strategy](
+        length=metadata.length,
+        distance=params.distance,
+        quantity=params.quantity,
+        start=params.start,
+        end_cut=params.end_cut,
+        rng=random.Random(seed),
+    )
+    start_times: list[int] = samples_strategy()
+
+    windows = [Window(start=t, duration=params.duration) for t in start_times]
+    samples = decode_samples(
+        path, format_, windows, params.pcm_format, cache, pack, file_hash
+    )
+    gain = gain_to_peak(
+        track_peak(path, format_, params.pcm_format, cache, pack, file_hash)
+    )
+
+    return PreparedSong(
+        path=path,
+        format=format_,
+        metadata=metadata,
+        gain=gain,
+        sample_duration=params.duration,
+        start_times=start_times,
+        samples=share_pcm([sample.apply_gain(gain) for sample in samples]),
+    )
+
+
+def _discard_prepared(prepared: PreparedSong) -> None:
+    for name in {handle.name for handle in prepared.samples}:
+        unlink_block(name)
+
+
 class Evaluation(StrEnum):
     DEFAULT = auto()
     FULL_ANSWER = auto()
@@ -107,6 +345,23 @@ class Answer:
         self._evaluation: Evaluation = Evaluation.DEFAULT
         self._score: float = 0.0
 
+    @classmethod
+    def from_save(cls, save: AnswerSave) -> Self:
+        instance = cls()
+        instance._answer_prompt = save.answer_prompt
+        instance._clues_used = save.clues_used
+        instance._evaluation = Evaluation(save.evaluation)
+        instance._score = save.score
+        return instance
+
+    def to_save(self) -> AnswerSave:
+        return AnswerSave(
+            answer_prompt=self._answer_prompt,
+            clues_used=self._clues_used,
+            evaluation=self._evaluation.value,
+            score=self._score,
+        )
+
     @property
     def answer_prompt(self) -> str:
         return self._answer_prompt
@@ -137,10 +392,34 @@ class Answer:
         return f"{self.answer_prompt} — {self.evaluation.name} — {self.score}"
 
 
+class GameAudioService(AudioService):
+    """
+    Player of full tracks of question songs, shared by all songs of the game.
+    """
+
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        audio_settings = get_settings().audio
+        super().__init__(
+            backend=get_playback_backend(),
+            memory=audio_settings.full_tracks_memory * 2**20,
+            stream=audio_settings.stream_full_tracks,
+            pcm_format=PcmFormat(sample_rate=audio_settings.sample_rate),
+        )
+
+
+def get_audio_service() -> GameAudioService:
+    return get_singleton_instance(GameAudioService)
+
+
 @dataclass
 class QuestionSong:
-    audio: PlayableSegment
+    path: Path
+    format: AllowedFormats
     metadata: Metadata
+    gain: float  # in dB, computed once from the peak of sampled windows
+    sample_duration: int  # in ms
     question_sample: Sample
     clue_samples: list[Sample]
     answer: Answer
@@ -150,21 +429,64 @@ class QuestionSong:
     def __post_init__(self):
         self.last_clue_number = -1
 
-    def play(self, start: int = 0) -> None:
-        process = Process(target=player_worker, args=(self.audio, start))
+    @property
+    def track(self) -> TrackReference:
+        """
+        Reference to the full track for the audio service.
+        The gain of samples is used only if the track is streamed.
+        """
+        return TrackReference(path=str(self.path), format=self.format, gain=self.gain)
 
-        process.start()
+    def play(self, start: int = 0) -> None:
+        audio_service = get_audio_service()
+        audio_service.play(self.track, start)
 
         input("Press ENTER to stop.")
         print("\033[F\033[F\r")
 
-        process.terminate()
-        process.join()
+        audio_service.stop()
+
+    @property
+    def samples(self) -> list[Sample]:
+        return [self.question_sample, *self.clue_samples]
+
+    def _hold_pcm(self, handles: list[PcmHandle]) -> None:
+        """
+        Keep blocks of shared memory with samples while the song exists.
+        """
+        shared_blocks = get_shared_blocks()
+        for name in {handle.name for handle in handles}:
+            shared_blocks.acquire(name)
+            weakref.finalize(self, shared_blocks.release, name)
+
+    def load_samples(self) -> None:
+        """
+        Decode samples of a restored song, from the proxy pack
+        or the samples cache if possible.
+        """
+        samples = [sample for sample in self.samples if sample.pcm is None]
+        if not samples:
+            return
+
+        windows = [Window(s.start_time, self.sample_duration) for s in samples]
+        segments = decode_samples(
+            self.path,
+            self.format,
+            windows,
+            get_samples_format(),
+            cache=get_sample_cache(),
+            pack=get_proxy_pack(),
+        )
+        handles = share_pcm([segment.apply_gain(self.gain) for segment in segments])
+        self._hold_pcm(handles)
+        for sample, handle in zip(samples, handles):
+            sample.pcm = handle
 
     def play_sample(self) -> None:
+        self.load_samples()
         self.question_sample.play()
 
-    def play_clue(self) -> None:
+    def choose_clue(self) -> int:
         from random import randint
 
         next_sample_strategy = get_settings().game.clues_strategy
@@ -173,36 +495,73 @@ class QuestionSong:
             clue_number = randint(0, len(self.clue_samples) - 1)
         elif next_sample_strategy == "new_next":
             clue_number = (self.last_clue_number + 1) % len(self.clue_samples)
-        self.last_clue_number = clue_number
+        return clue_number
 
+    def use_clue(self, clue_number: int) -> None:
+        self.last_clue_number = clue_number
         self.answer.use_clue()
+
+    def play_clue(self, clue_number: int) -> None:
+        self.load_samples()
         self.clue_samples[clue_number].play()
 
     @classmethod
-    def from_path(cls, path: Path) -> Self:
-        audio = PlayableSegment.from_path(path)
-        metadata = Metadata.from_path(path)
-
-        settings = get_settings()
-        current_strategy = settings.sampling.strategy
-        samples_strategy = SAMPLES_STRATEGIES_MAPPING[current_strategy](
-            length=metadata.length,
-            distance=int(settings.sampling.distance * 1000),
-            quantity=settings.sampling.clues_quantity + 1,
-            start=int(settings.sampling.from_ * 1000),
-            end_cut=int(settings.sampling.to_finish * 1000),
+    def from_path(
+        cls,
+        path: Path,
+        format_: AllowedFormats | None = None,
+        metadata: Metadata | None = None,
+    ) -> Self:
+        format_ = format_ or AllowedFormats.from_path(path)
+        metadata = metadata or Metadata.from_path(path, format_)
+        prepared = prepare_song(
+            path,
+            format_,
+            metadata,
+            SamplingParams.from_settings(),
+            cache=get_sample_cache(),
+            pack=get_proxy_pack(),
         )
-        start_times: list[int] = samples_strategy()
+        return cls.from_prepared(prepared)
 
-        return cls(
-            audio=audio,
-            metadata=metadata,
-            question_sample=Sample(full_audio=audio, start_time=start_times[0]),
-            clue_samples=[
-                Sample(full_audio=audio, start_time=t) for t in start_times[1:]
-            ],
+    @classmethod
+    def from_prepared(cls, prepared: PreparedSong) -> Self:
+        samples = [
+            Sample(start_time=start_time, pcm=handle)
+            for start_time, handle in zip(prepared.start_times, prepared.samples)
+        ]
+
+        song = cls(
+            path=prepared.path,
+            format=prepared.format,
+            metadata=prepared.metadata,
+            gain=prepared.gain,
+            sample_duration=prepared.sample_duration,
+            question_sample=samples[0],
+            clue_samples=samples[1:],
             answer=Answer(),
         )
+        song._hold_pcm(prepared.samples)
+        return song
+
+    @classmethod
+    def from_save(cls, save: SongSave, sample_duration: int) -> Self:
+        """
+        Restore a taken song, its samples are decoded when played again.
+        """
+        samples = [Sample(start_time=start_time) for start_time in save.start_times]
+        song = cls(
+            path=Path(save.path),
+            format=AllowedFormats(save.format),
+            metadata=Metadata(**save.metadata),
+            gain=save.gain,
+            sample_duration=sample_duration,
+            question_sample=samples[0],
+            clue_samples=samples[1:],
+            answer=Answer.from_save(save.answer) if save.answer else Answer(),
+        )
+        song.last_clue_number = save.last_clue_number
+        return song
 
     def __str__(self):
         m = self.metadata
@@ -210,18 +569,314 @@ class QuestionSong:
 
 
 class Audiofile:
-    path: Path
-    filename: str
-    format: AllowedFormats
-    metadata: Metadata
+    """
+    View of a single row of the catalog, built on access.
+    Metadata is read from the file on the first access, if it was not loaded.
+    """
+
+    __slots__ = ("_catalog", "_index")
+
+    def __init__(self, catalog: "Catalog", index: int):
+        self._catalog = catalog
+        self._index = index
+
+    @property
+    def path(self) -> Path:
+        return Path(self._catalog.path_at(self._index))
+
+    @property
+    def filename(self) -> str:
+        return self._catalog.filename_at(self._index)
+
+    @property
+    def format(self) -> AllowedFormats:
+        return self._catalog.format_at(self._index)
+
+    @property
+    def metadata(self) -> Metadata:
+        return self._catalog.metadata_at(self._index)
+
+    @property
+    def is_metadata_loaded(self) -> bool:
+        return self._catalog.is_metadata_loaded_at(self._index)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Audiofile):
+            return NotImplemented
+        return self._catalog is other._catalog and self._index == other._index
+
+    def __hash__(self) -> int:
+        return hash((id(self._catalog), self._index))
+
+    def __repr__(self) -> str:
+        return f"Audiofile({self._catalog.path_at(self._index)!r})"
+
+
+_FORMATS = tuple(AllowedFormats)
+_NO_VALUE = -1
+_TOP_ARTISTS_NUMBER = 5
+
+
+class Catalog(Sequence[Audiofile]):
+    """
+    Columnar in-memory catalog of audiofiles.
+
+    Paths are split into a table of directories and file names,
+    artists and albums are dictionary-encoded, numbers and formats
+    are stored in arrays. Rows are exposed as Audiofile views,
+    so no per-track objects are kept.
+    Rows may have no metadata until it is loaded in batch or on access.
+    """
 
-    __slots__ = ("path", "filename", "format", "metadata")
+    __slots__ = (
+        "_dirs",
+        "_dir_codes",
+        "_filenames",
+        "_formats",
+        "_titles",
+        "_strings",
+        "_string_codes",
+        "_artists",
+        "_albums",
+        "_years",
+        "_track_numbers",
+        "_lengths",
+        "_order",
+    )
+
+    def __init__(self) -> None:
+        self._dirs: list[str] = []
+        self._dir_codes = array("I")
+        self._filenames: list[str] = []
+        self._formats = array("B")
+        self._titles: list[str | None] = []
+        self._strings: list[str | None] = [None]
+        self._string_codes: dict[str | None, int] = {None: 0}
+        self._artists = array("I")
+        self._albums = array("I")
+        self._years = array("i")
+        self._track_numbers = array("i")
+        self._lengths = array("i")  # _NO_VALUE while metadata is not loaded
+        self._order: array | None = None  # rows sorted for the stats, built on demand
+
+    @classmethod
+    def from_records(cls, records: Iterable[TrackRecord]) -> Self:
+        catalog = cls()
+        dir_codes: dict[str, int] = {}
+
+        for record in records:
+            dir_path, filename = os.path.split(record.path)
+            if (dir_code := dir_codes.get(dir_path)) is None:
+                dir_code = dir_codes[dir_path] = len(catalog._dirs)
+                catalog._dirs.append(dir_path)
+
+            catalog._dir_codes.append(dir_code)
+            catalog._filenames.append(filename)
+            catalog._formats.append(_FORMATS.index(record.format))
+            catalog._titles.append(None)
+            catalog._artists.append(0)
+            catalog._albums.append(0)
+            catalog._years.append(_NO_VALUE)
+            catalog._track_numbers.append(_NO_VALUE)
+            catalog._lengths.append(_NO_VALUE)
+            if record.has_tags:
+                catalog._set_tags(len(catalog) - 1, record.tags)
+
+        return catalog
+
+    def _encode(self, value: str | None) -> int:
+        if (code := self._string_codes.get(value)) is None:
+            code = self._string_codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    @staticmethod
+    def _number(value: int) -> int | None:
+        return None if value == _NO_VALUE else value
+
+    def _set_tags(self, index: int, tags: dict[str, Any]) -> None:
+        self._titles[index] = tags["title"]
+        self._artists[index] = self._encode(tags["artist"])
+        self._albums[index] = self._encode(tags["album"])
+        self._years[index] = _NO_VALUE if tags["year"] is None else tags["year"]
+        self._track_numbers[index] = (
+            _NO_VALUE if tags["track_number"] is None else tags["track_number"]
+        )
+        self._lengths[index] = tags["length"]
+        self._order = None
+
+    def load_metadata(self, indexes: Iterable[int] | None = None) -> None:
+        """
+        Read tags of given rows (all rows by default) in one parallel batch,
+        skipping rows with already loaded metadata.
+        """
+        indexes = range(len(self)) if indexes is None else indexes
+        indexes = [i for i in indexes if not self.is_metadata_loaded_at(i)]
+        if not indexes:
+            return
+
+        files = [(self.path_at(i), self.format_at(i)) for i in indexes]
+        for index, tags in zip(indexes, get_library_loader().load_tags(files)):
+            self._set_tags(index, tags)
+
+    def is_metadata_loaded_at(self, index: int) -> bool:
+        return self._lengths[index] != _NO_VALUE
+
+    def path_at(self, index: int) -> str:
+        return os.path.join(self._dirs[self._dir_codes[index]], self._filenames[index])
+
+    def filename_at(self, index: int) -> str:
+        return self._filenames[index]
+
+    def format_at(self, index: int) -> AllowedFormats:
+        return _FORMATS[self._formats[index]]
+
+    def metadata_at(self, index: int) -> Metadata:
+        self.load_metadata([index])
+        return Metadata(
+            title=self._titles[index],
+            artist=self._strings[self._artists[index]],
+            album=self._strings[self._albums[index]],
+            year=self._number(self._years[index]),
+            track_number=self._number(self._track_numbers[index]),
+            length=self._lengths[index],
+        )
+
+    def _sort_key(self, index: int) -> tuple:
+        return (
+            self._strings[self._artists[index]] or "",
+            self._years[index],
+            self._strings[self._albums[index]] or "",
+            self._track_numbers[index],
+            self._titles[index] or "",
+        )
+
+    def sorted_rows(self, rows: range) -> Iterator[int]:
+        """
+        Given rows in the order of artist, year, album, track number and title.
+        The order of the whole catalog is kept until metadata is changed.
+        """
+        self.load_metadata(rows)
+        if self._order is None:
+            self._order = array("I", sorted(range(len(self)), key=self._sort_key))
+        return (i for i in self._order if i in rows)
+
+    def stats(self, rows: range) -> LibraryStats:
+        """
+        Aggregates of given rows, computed over slices of the columns.
+        """
+        self.load_metadata(rows)
+        artists = self._artists[rows.start : rows.stop]
+        albums = self._albums[rows.start : rows.stop]
+
+        tracks_by_artists = collections.Counter(artists)
+        tracks_by_artists.pop(0, None)  # no artist in tags
+        formats = collections.Counter(self._formats[rows.start : rows.stop])
+
+        return LibraryStats(
+            tracks_number=len(rows),
+            artists_number=len(tracks_by_artists),
+            albums_number=len({pair for pair in zip(artists, albums) if pair[1]}),
+            total_length=sum(self._lengths[rows.start : rows.stop]),
+            formats={_FORMATS[code].name: n for code, n in formats.most_common()},
+            top_artists=[
+                (self._strings[code], n)
+                for code, n in tracks_by_artists.most_common(_TOP_ARTISTS_NUMBER)
+            ],
+        )
+
+    def __len__(self) -> int:
+        return len(self._filenames)
+
+    def __getitem__(self, index: int) -> Audiofile:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Catalog index out of range")
+        return Audiofile(self, index)
+
+
+def load_metadata(audiofiles: Iterable[Audiofile]) -> None:
+    """
+    Batch-read metadata of audiofiles which do not have it loaded yet.
+    """
+    indexes_by_catalogs: dict[Catalog, list[int]] = {}
+    for audiofile in audiofiles:
+        if not audiofile.is_metadata_loaded:
+            indexes_by_catalogs.setdefault(audiofile._catalog, []).append(
+                audiofile._index
+            )
+
+    for catalog, indexes in indexes_by_catalogs.items():
+        catalog.load_metadata(indexes)
+
+
+def get_library_loader() -> ParallelLoader:
+    settings = get_settings()
+    return ParallelLoader(
+        workers=settings.library.workers,
+        executor_type=settings.library.executor,
+        chunk_size=settings.library.chunk_size,
+    )
+
+
+class AudiofilesRegistry(LibraryRegistry[Audiofile]):
+    """
+    Audiofiles of all players' libraries, read through the library index.
+    Tags are read during the scan only if the songs selection strategy needs them.
+    """
+
+    def load(self, root: str) -> Catalog:
+        settings = get_settings()
+        strategy = SONGS_STRATEGIES_MAPPING[settings.selection.strategy]
+        index = LibraryIndex(
+            settings.service_paths.library_index_path, loader=get_library_loader()
+        )
+        records = index.scan(
+            root,
+            skip_hidden=settings.library.skip_hidden,
+            ignore_file_name=settings.library.ignore_file_name,
+            on_progress=ProgressViewer("Scanning libraries"),
+            with_tags=bool(strategy.required_fields),
+        )
+        return Catalog.from_records(records)
+
+    def path_of(self, item: Audiofile) -> str:
+        return str(item.path)
+
+    def includes(self, root: str, path: str) -> bool:
+        settings = get_settings()
+        return is_walked(
+            root,
+            path,
+            skip_hidden=settings.library.skip_hidden,
+            ignore_file_name=settings.library.ignore_file_name,
+        )
+
+
+def get_library_registry() -> AudiofilesRegistry:
+    return get_singleton_instance(AudiofilesRegistry)
 
-    def __init__(self, path: Path):
-        self.path = path
-        self.filename = path.name
-        self.format = AllowedFormats.from_path(path)
-        self.metadata = Metadata.from_path(path)
+
+def build_proxy_pack() -> PackReport:
+    """
+    Pack all audiofiles of players' libraries in the format of samples,
+    so samples of any song are sliced out of the pack.
+    """
+    settings = get_settings().load_from_file()
+    paths = [player.path for player in settings.players if player.path]
+    registry = get_library_registry()
+    registry.register(*paths)
+    audiofiles = sorted(
+        {str(file.path) for path in paths for file in registry.view(path)}
+    )
+    return build_pack(
+        settings.service_paths.proxy_pack_path,
+        audiofiles,
+        get_samples_format(),
+        workers=settings.audio.preparation_workers or os.cpu_count() or 1,
+        on_progress=ProgressViewer("Packing tracks"),
+    )
 
 
 class HelpUsage:
@@ -260,60 +915,85 @@ class Player:
     id: int
     name: str
     library_path: Path
-    audiofiles: set[Audiofile]
+    audiofiles: Sequence[Audiofile]
     songs: list[QuestionSong]
 
     help_usage: HelpUsage
 
-    __slots__ = ("id", "name", "library_path", "audiofiles", "songs", "help_usage")
+    __slots__ = ("id", "name", "library_path", "_audiofiles", "songs", "help_usage")
 
     def __init__(self, *, id_: int, name: str, library_path: Path | None) -> None:
         self.id: int = id_
         self.name: str = name
         self.library_path: Path = library_path
 
-        self.audiofiles: set[Audiofile] = self.get_all_audiofiles()
+        self._audiofiles: Sequence[Audiofile] | None = None
         self.songs: list[QuestionSong] = []
 
         self.help_usage: HelpUsage = HelpUsage()
 
-    def get_all_audiofiles(self) -> set[Audiofile]:
+    @property
+    def audiofiles(self) -> Sequence[Audiofile]:
+        """
+        Audiofiles of the library, it is scanned on the first access,
+        so restored games do not scan libraries until they are needed.
+        """
+        if self._audiofiles is None:
+            self._audiofiles = self.get_all_audiofiles()
+        return self._audiofiles
+
+    def get_all_audiofiles(self) -> Sequence[Audiofile]:
         if not self.library_path:
-            return set()
-        audiofiles_paths = get_audiofiles_paths(self.library_path)
-        return {Audiofile(path=Path(path)) for path in audiofiles_paths}
+            return []
+        return get_library_registry().view(self.library_path)
 
-    def initialize_songs(self):
+    def choose_songs(self) -> list[Audiofile]:
+        """
+        Select audiofiles for all rounds, songs are prepared from them by the game.
+        """
         current_strategy = get_settings().selection.strategy
         strategy_function = SONGS_STRATEGIES_MAPPING[current_strategy]()
 
         quantity = get_settings().game.rounds_number
+        if strategy_function.required_fields:
+            load_metadata(self.audiofiles)
         chosen_audiofiles = strategy_function(
-            audiofiles=list(self.audiofiles), quantity=quantity
+            audiofiles=self.audiofiles, quantity=quantity
         )
+        load_metadata(chosen_audiofiles)
 
-        self.songs = [QuestionSong.from_path(file.path) for file in chosen_audiofiles]
+        self.songs = []
+        return chosen_audiofiles
 
     def get_library_short_repr(self) -> str:
         header = f"{bold(self.name)} (id={self.id + 1}): {str(self.library_path)}"
         count = f"\t{bold(str(len(self.audiofiles)))} audiofiles found in library."
         return f"{header}\n{count}\n"
 
-    def get_library_extended_repr(self) -> str:
-        metadata_list = [Metadata.from_path(f.path) for f in self.audiofiles]
-        metadata_list.sort(
-            key=lambda x: (x.artist, x.year, x.album, x.track_number, x.title),
-        )
+    def _catalog_rows(self) -> tuple[Catalog, range] | None:
+        if not isinstance(self.audiofiles, LibraryView) or not self.audiofiles:
+            return None
+        return self.audiofiles.source, self.audiofiles.rows
 
+    def get_library_extended_repr(self) -> str:
         short_repr = self.get_library_short_repr()
+        if (catalog_rows := self._catalog_rows()) is None:
+            return short_repr
 
-        details = "\n"
-        if len(self.audiofiles):
-            details = "\n".join(
-                [("\t\t" + str(metadata)) for metadata in metadata_list]
-            )
+        catalog, rows = catalog_rows
+        return f"{short_repr}{catalog.stats(rows)}"
 
-        return f"{short_repr}{details}\n"
+    def iter_library_pages(self, page_size: int) -> Iterator[str]:
+        """
+        Lazily render metadata of all audiofiles sorted by artist, year and album,
+        `page_size` lines per page.
+        """
+        if (catalog_rows := self._catalog_rows()) is None:
+            return
+
+        catalog, rows = catalog_rows
+        for page in batched(catalog.sorted_rows(rows), page_size):
+            yield "\n".join(f"\t\t{catalog.metadata_at(i)}" for i in page) + "\n"
 
 
 class GameCounter:
@@ -383,26 +1063,308 @@ class GameStatus(StrEnum):
     FINISHED = auto()
 
 
+@dataclass(frozen=True, slots=True)
+class SongJob:
+    """
+    Song chosen for a turn, with everything needed to prepare it in another process.
+    The content hash is computed once, when the song is chosen, and saved with it.
+    """
+
+    path: Path
+    format: AllowedFormats
+    metadata: Metadata
+    params: SamplingParams
+    seed: int
+    content_hash: str
+    cache: SampleCache | None = None
+    pack: ProxyPack | None = None
+
+
+def _prepare_song(job: SongJob) -> PreparedSong:
+    return prepare_song(
+        job.path,
+        job.format,
+        job.metadata,
+        job.params,
+        seed=job.seed,
+        cache=job.cache,
+        pack=job.pack,
+        file_hash=job.content_hash,
+    )
+
+
+def _current_hash(path: Path) -> str | None:
+    try:
+        return content_hash(path)
+    except OSError:
+        return None
+
+
+def _restore_job(
+    song: SongSave,
+    params: SamplingParams,
+    cache: SampleCache | None,
+    pack: ProxyPack | None,
+) -> SongJob:
+    """
+    Job of a saved song. If the audiofile was changed after saving,
+    its metadata is read again, so the song is prepared from the file as it is now.
+    """
+    path, format_ = Path(song.path), AllowedFormats(song.format)
+    metadata, file_hash = Metadata(**song.metadata), _current_hash(path)
+    if file_hash is None:
+        logger.warning("Audiofile of the saved game is not found: %s", path)
+        file_hash = song.content_hash
+    elif file_hash != song.content_hash:
+        logger.warning(
+            "Audiofile was changed after the game was saved, "
+            "its samples are chosen again: %s",
+            path,
+        )
+        metadata = Metadata.from_path(path, format_)
+
+    return SongJob(
+        path=path,
+        format=format_,
+        metadata=metadata,
+        params=params,
+        seed=song.seed,
+        content_hash=file_hash,
+        cache=cache,
+        pack=pack,
+    )
+
+
+def _restore_song(song: SongSave, job: SongJob) -> QuestionSong:
+    """
+    Taken song of the save. Saved samples of a changed audiofile
+    may not match it anymore, so the song is prepared again.
+    """
+    if job.content_hash == song.content_hash:
+        return QuestionSong.from_save(song, sample_duration=job.params.duration)
+
+    restored = QuestionSong.from_prepared(_prepare_song(job))
+    restored.answer = Answer.from_save(song.answer) if song.answer else Answer()
+    restored.last_clue_number = song.last_clue_number
+    return restored
+
+
 class Game:
     rounds: int
     players: list[Player]
     counter: GameCounter
     status: GameStatus
 
-    __slots__ = ("rounds", "players", "counter", "status")
+    __slots__ = (
+        "rounds",
+        "players",
+        "counter",
+        "status",
+        "_jobs",
+        "_preparation",
+        "_journal",
+    )
 
     def __init__(self, players: list[Player], rounds: int) -> None:
         self.status = GameStatus.NOT_STARTED
+        self._jobs: list[SongJob] = []  # in the order of turns
+        self._preparation: PreparationPipeline[SongJob, PreparedSong] | None = None
+        self._journal: GameJournal | None = None
         self.reset_game(players, rounds)
 
     def reset_game(self, players: list[Player], rounds: int) -> None:
         self.players, self.rounds = players, rounds
         self.counter = GameCounter(players=len(players), rounds=rounds)
         self.status = GameStatus.NOT_STARTED
+        self._stop_preparation()
+        self._close_journal()
+
+    def _stop_preparation(self) -> None:
+        if self._preparation is not None:
+            self._preparation.shutdown()
+            self._preparation = None
+
+    def _open_journal(self, number: int = 0) -> None:
+        settings = get_settings()
+        self._close_journal()
+        self._journal = GameJournal(
+            settings.service_paths.game_journal_path,
+            fsync=FsyncPolicy(settings.autosave.fsync),
+            number=number,
+        )
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def close(self) -> None:
+        self._stop_preparation()
+        self._close_journal()
 
     def initialize_songs(self):
+        """
+        Choose songs of all players and start preparing them in the order of turns
+        on a pool of processes. Seeds of jobs are drawn here, so samples
+        do not depend on which worker prepares a song.
+        The game is saved at once, its events are journaled from here on.
+        Nothing is started if a library has fewer audiofiles than rounds.
+        """
         for player in self.players:
-            player.initialize_songs()
+            if (found := len(player.audiofiles)) < self.rounds:
+                raise NotEnoughSongsError(
+                    f"{player.name}'s library {player.library_path} has "
+                    f"{found} audiofiles, {self.rounds} are needed for all rounds"
+                )
+
+        params, cache = SamplingParams.from_settings(), get_sample_cache()
+        pack = get_proxy_pack()
+        chosen_audiofiles = [player.choose_songs() for player in self.players]
+        jobs = [
+            SongJob(
+                path=file.path,
+                format=file.format,
+                metadata=file.metadata,
+                params=params,
+                seed=random.getrandbits(64),
+                content_hash=content_hash(file.path),
+                cache=cache,
+                pack=pack,
+            )
+            for round_audiofiles in zip(*chosen_audiofiles)
+            for file in round_audiofiles
+        ]
+
+        get_audio_service().start()
+        self._start_preparation(jobs)
+
+        self._open_journal()
+        self._journal.truncate()  # of the previous game
+        self.save_to_file()
+
+    def _start_preparation(self, jobs: list[SongJob], start: int = 0) -> None:
+        settings = get_settings()
+        self._stop_preparation()
+        self._jobs = jobs
+        get_shared_blocks()  # before workers, so blocks they create outlive them
+        workers = settings.audio.preparation_workers or os.cpu_count() or 1
+        self._preparation = PreparationPipeline(
+            _prepare_song,
+            jobs,
+            window=settings.audio.prefetch_window,
+            executor=ProcessPoolExecutor(
+                max_workers=workers, mp_context=_workers_context()
+            ),
+            start=start,
+            discard=_discard_prepared,
+        )
+
+    @property
+    def preparation_metrics(self) -> PreparationMetrics | None:
+        if self._preparation is None:
+            return None
+        return self._preparation.metrics
+
+    def _collect_songs(self, player: Player, rounds: int) -> None:
+        """
+        Hand prepared songs of the first `rounds` rounds to the player,
+        waiting for them if they are not ready yet.
+        """
+        while len(player.songs) < rounds:
+            turn = len(player.songs) * len(self.players) + player.id
+            try:
+                prepared = self._preparation.get(turn)
+            except PreparationError:
+                logger.exception("Song of turn %d is prepared again", turn)
+                prepared = self._prepare_again(player, turn)
+            player.songs.append(QuestionSong.from_prepared(prepared))
+            self._record(
+                JournalEvent.SONG_TAKEN,
+                player_id=player.id,
+                song=asdict(self._song_save(player, len(player.songs) - 1)),
+            )
+
+    def _prepare_again(self, player: Player, turn: int) -> PreparedSong:
+        """
+        Prepare the song of a failed job in this process. If its audiofile
+        cannot be prepared at all, another song of the player's library is chosen.
+        """
+        job = self._jobs[turn]
+        try:
+            return _prepare_song(job)
+        except (SongRouletteError, OSError):
+            logger.exception("Another song is chosen instead of %s", job.path)
+
+        turns = range(player.id, len(self._jobs), len(self.players))
+        chosen = {self._jobs[turn].path for turn in turns}
+        audiofiles = player.audiofiles
+        for index in random.sample(range(len(audiofiles)), len(audiofiles)):
+            file = audiofiles[index]
+            if file.path in chosen:
+                continue
+            try:
+                load_metadata([file])
+                job = replace(
+                    job,
+                    path=file.path,
+                    format=file.format,
+                    metadata=file.metadata,
+                    seed=random.getrandbits(64),
+                    content_hash=content_hash(file.path),
+                )
+                prepared = _prepare_song(job)
+            except (SongRouletteError, OSError):
+                logger.exception("Another song is chosen instead of %s", file.path)
+                continue
+            self._jobs[turn] = job
+            return prepared
+
+        raise PreparationError(f"No song of {player.name} can be prepared")
+
+    def _record(self, event: JournalEvent, **data: Any) -> None:
+        if self._journal is not None:
+            self._journal.record(event, **data)
+
+    def _apply(self, event: JournalEvent, data: dict[str, Any]) -> None:
+        """
+        Change the state of the game by the event without playing anything,
+        so events read from the journal are replayed the same way.
+        """
+        match event:
+            case JournalEvent.SONG_TAKEN:
+                player = self.players[data["player_id"]]
+                song_save = SongSave.from_dict(data["song"])
+                turn = len(player.songs) * len(self.players) + player.id
+                if song_save.content_hash != self._jobs[turn].content_hash:
+                    # the song was chosen again, as its job failed
+                    self._jobs[turn] = replace(
+                        self._jobs[turn],
+                        path=Path(song_save.path),
+                        format=AllowedFormats(song_save.format),
+                        metadata=Metadata(**song_save.metadata),
+                        seed=song_save.seed,
+                        content_hash=song_save.content_hash,
+                    )
+                song = QuestionSong.from_save(
+                    song_save, sample_duration=self._jobs[0].params.duration
+                )
+                player.songs.append(song)
+            case JournalEvent.TURN_STARTED:
+                next(self.counter)
+                self.current_player.help_usage.repeats.reset()
+            case JournalEvent.SAMPLE_PLAYED:
+                self.current_player.help_usage.repeats.decrement()
+            case JournalEvent.CLUE_USED:
+                self.current_player.help_usage.clues.decrement()
+                self.current_song.use_clue(data["clue_number"])
+            case JournalEvent.ANSWER_GIVEN:
+                self.current_song.answer.give_answer(data["answer_prompt"])
+            case JournalEvent.EVALUATED:
+                self.current_song.answer.evaluate(Evaluation(data["evaluation"]))
+
+    def _commit(self, event: JournalEvent, **data: Any) -> None:
+        self._apply(event, data)
+        self._record(event, **data)
 
     @property
     def current_round(self) -> int:
@@ -414,12 +1376,48 @@ class Game:
 
     @property
     def current_song(self) -> QuestionSong:
+        self._collect_songs(self.current_player, self.current_round + 1)
         return self.current_player.songs[self.current_round]
 
-    def next_iteration(self):
-        next(self.counter)
+    @property
+    def turn(self) -> int:
+        return self.current_round * len(self.players) + self.counter.current_player_id
+
+    def play_sample(self) -> None:
+        self.current_song.play_sample()
+        self._commit(JournalEvent.SAMPLE_PLAYED)
+
+    def play_clue(self) -> None:
+        clue_number = self.current_song.choose_clue()
+        self.current_song.play_clue(clue_number)
+        self._commit(JournalEvent.CLUE_USED, clue_number=clue_number)
+
+    def give_answer(self, answer_prompt: str) -> None:
+        self._commit(JournalEvent.ANSWER_GIVEN, answer_prompt=answer_prompt)
 
-        self.current_player.help_usage.repeats.reset()
+    def evaluate(self, evaluation: Evaluation) -> None:
+        self._commit(JournalEvent.EVALUATED, evaluation=evaluation.value)
+
+    def next_iteration(self):
+        try:
+            self._commit(JournalEvent.TURN_STARTED)
+        except StopIteration:  # the last round is over
+            self.finish()
+            raise
+
+        if self.turn % get_settings().autosave.snapshot_every == 0:
+            self.save_to_file()
+
+    def finish(self) -> None:
+        """
+        End the game after its last turn. There is nothing to resume,
+        so its save and journal are deleted.
+        """
+        self.status = GameStatus.FINISHED
+        self.close()
+        service_paths = get_settings().service_paths
+        delete_save(service_paths.game_save_path)
+        delete_journal(service_paths.game_journal_path)
 
     def get_score(self) -> TemplateString:
         score = Score(
@@ -480,6 +1478,7 @@ class Game:
     @classmethod
     def from_settings(cls):
         settings = get_settings().load_from_file()
+        get_library_registry().register(*(player.path for player in settings.players))
 
         game = cls(
             players=[
@@ -492,21 +1491,130 @@ class Game:
 
         return game
 
+    def _song_save(self, player: Player, round_number: int) -> SongSave:
+        job = self._jobs[round_number * len(self.players) + player.id]
+        save = SongSave(
+            path=str(job.path),
+            format=job.format.value,
+            content_hash=job.content_hash,
+            metadata=asdict(job.metadata),
+            seed=job.seed,
+        )
+        if round_number >= len(player.songs):
+            return save
+
+        song = player.songs[round_number]
+        return replace(
+            save,
+            start_times=[s.start_time for s in song.samples],
+            gain=song.gain,
+            last_clue_number=song.last_clue_number,
+            answer=song.answer.to_save(),
+        )
+
+    def to_save(self) -> GameSave:
+        """
+        Compact state of the game: songs are saved as references to audiofiles
+        and positions of their samples, no audio is saved.
+        """
+        players = [
+            PlayerSave(
+                id=player.id,
+                name=player.name,
+                library_path=player.library_path and str(player.library_path),
+                repeats_left=player.help_usage.repeats_left,
+                clues_left=player.help_usage.clues_left,
+                songs=[self._song_save(player, i) for i in range(self.rounds)],
+            )
+            for player in self.players
+        ]
+
+        return GameSave(
+            rounds=self.rounds,
+            status=self.status,
+            turn=self.turn,
+            sampling=asdict(self._jobs[0].params),
+            players=players,
+            journal_number=self._journal.number if self._journal else 0,
+        )
+
+    def save_to_file(self) -> None:
+        """
+        Save a snapshot of the game, journaled events before it are dropped.
+        """
+        if not self._jobs:
+            return
+        settings = get_settings()
+        write_save(
+            settings.service_paths.game_save_path,
+            self.to_save(),
+            fsync=FsyncPolicy(settings.autosave.fsync) != FsyncPolicy.NEVER,
+        )
+        if self._journal is not None:
+            self._journal.truncate()
+
     @classmethod
-    def from_pickle(cls) -> Self | None:
-        pickle_path = get_settings().service_paths.game_pickle_path
-        try:
-            with open(pickle_path, "rb") as file:
-                game = pickle.load(file)
-                cls._instance = game
-                return game
-        except FileNotFoundError:
+    def load_from_file(cls) -> Self | None:
+        """
+        Restore the game from the save file and replay events journaled after it.
+        Samples of played songs are decoded when they are played again,
+        songs which were not played are prepared again from their seeds,
+        so the same samples are chosen. Songs of audiofiles changed after saving
+        are prepared again, with a warning.
+        """
+        service_paths = get_settings().service_paths
+        save = read_save(service_paths.game_save_path)
+        if save is None:
             return None
 
-    def pickle(self) -> None:
-        pickle_path = get_settings().service_paths.game_pickle_path
-        with open(pickle_path, "wb") as file:
-            pickle.dump(self, file)
+        params, cache = SamplingParams(**save.sampling), get_sample_cache()
+        pack = get_proxy_pack()
+        players, players_jobs = [], []
+        for player_save in save.players:
+            player_jobs = [
+                _restore_job(song, params, cache, pack) for song in player_save.songs
+            ]
+            player = Player(
+                id_=player_save.id,
+                name=player_save.name,
+                library_path=player_save.library_path,
+            )
+            player.help_usage = HelpUsage.restore(
+                repeats=player_save.repeats_left, clues=player_save.clues_left
+            )
+            player.songs = [
+                _restore_song(song, job)
+                for song, job in zip(player_save.songs, player_jobs)
+                if song.start_times is not None
+            ]
+            players.append(player)
+            players_jobs.append(player_jobs)
+
+        jobs = [
+            player_jobs[round_number]
+            for round_number in range(save.rounds)
+            for player_jobs in players_jobs
+        ]
+
+        game = cls(players=players, rounds=save.rounds)
+        game._jobs = jobs
+        for _ in range(save.turn):
+            next(game.counter)
+        game.status = GameStatus(save.status)
+
+        journal_number = save.journal_number
+        entries = read_journal(service_paths.game_journal_path, after=journal_number)
+        for entry in entries:
+            game._apply(entry.event, entry.data)
+            journal_number = entry.number
+
+        start = min(len(p.songs) * len(players) + p.id for p in players)
+        get_audio_service().start()
+        game._start_preparation(jobs, start=start)
+        game._open_journal(number=journal_number)
+        cls._instance = game
+
+        return game
 
 
 def get_game() -> Game:
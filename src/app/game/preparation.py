@@ -0,0 +1,149 @@
+import logging
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Generic, Sequence, TypeVar
+
+from app.exceptions import PreparationError
+
+
+logger = logging.getLogger(__name__)
+
+Job = TypeVar("Job")
+Result = TypeVar("Result")
+
+
+@dataclass(frozen=True, slots=True)
+class PreparationMetrics:
+    jobs_number: int
+    ready_number: int
+    pending_number: int  # submitted to workers, but not finished yet
+    waits_number: int  # times the game had to wait for a job
+    wait_seconds: float
+    preparation_seconds: float  # average time of preparing a job
+
+    def __str__(self):
+        return (
+            f"{self.ready_number}/{self.jobs_number} ready, "
+            f"{self.pending_number} pending, "
+            f"{self.preparation_seconds:.2f} s per job, "
+            f"waited {self.waits_number} times for {self.wait_seconds:.2f} s"
+        )
+
+
+def _timed(prepare: Callable[[Job], Result], job: Job) -> tuple[Result, float]:
+    start_time = time.perf_counter()
+    result = prepare(job)
+    return result, time.perf_counter() - start_time
+
+
+class PreparationPipeline(Generic[Job, Result]):
+    """
+    Prepares results of jobs in background workers in the order of jobs.
+
+    Only `window` jobs ahead of the last requested one are submitted,
+    so the first job is prepared first and workers do not run too far
+    ahead of the game. Requesting a result blocks only if it is not ready yet.
+    Each result is given away once and is not kept by the pipeline.
+    Jobs before `start` are considered already given away.
+    A job which fails is reported by `PreparationError` when its result is requested.
+    Results which are not given away before shutdown are passed to `discard`.
+    """
+
+    __slots__ = (
+        "_prepare",
+        "_jobs",
+        "_window",
+        "_executor",
+        "_discard",
+        "_start",
+        "_futures",
+        "_seconds",
+        "_waits_number",
+        "_wait_seconds",
+    )
+
+    def __init__(
+        self,
+        prepare: Callable[[Job], Result],
+        jobs: Sequence[Job],
+        *,
+        window: int,
+        executor: Executor | None = None,
+        start: int = 0,
+        discard: Callable[[Result], None] | None = None,
+    ) -> None:
+        self._prepare = prepare
+        self._jobs = jobs
+        self._window = window
+        self._executor = executor or ThreadPoolExecutor(max_workers=window)
+        self._discard = discard
+        self._start = start
+        self._futures: list[Future[tuple[Result, float]] | None] = [None] * start
+        self._seconds: list[float] = []  # of jobs whose results were given away
+
+        self._waits_number = 0
+        self._wait_seconds = 0.0
+
+        self._submit_until(start + window)
+
+    def _submit_until(self, index: int) -> None:
+        stop = min(index + 1, len(self._jobs))
+        for job in self._jobs[len(self._futures) : stop]:
+            self._futures.append(self._executor.submit(_timed, self._prepare, job))
+
+    def get(self, index: int) -> Result:
+        if not 0 <= index < len(self._jobs):
+            raise IndexError(f"No job {index}, there are {len(self._jobs)} jobs")
+        self._submit_until(index + self._window)
+        future = self._futures[index]
+        if future is None:
+            raise IndexError(f"Result of job {index} is already given away")
+
+        if not future.done():
+            start_time = time.perf_counter()
+            future.exception()
+            self._waits_number += 1
+            self._wait_seconds += time.perf_counter() - start_time
+            logger.info("Waited for job %d: %s", index, self.metrics)
+
+        self._futures[index] = None
+        try:
+            result, seconds = future.result()
+        except Exception as error:
+            raise PreparationError(f"Job {index} failed: {error!r}") from error
+        self._seconds.append(seconds)
+        return result
+
+    @property
+    def metrics(self) -> PreparationMetrics:
+        futures = [f for f in self._futures if f is not None]
+        done = [
+            f
+            for f in futures
+            if f.done() and not f.cancelled() and f.exception() is None
+        ]
+        seconds = self._seconds + [f.result()[1] for f in done]
+        return PreparationMetrics(
+            jobs_number=len(self._jobs) - self._start,
+            ready_number=len(seconds),
+            pending_number=sum(not f.done() for f in futures),
+            waits_number=self._waits_number,
+            wait_seconds=self._wait_seconds,
+            preparation_seconds=sum(seconds) / len(seconds) if seconds else 0.0,
+        )
+
+    def _discard_result(self, future: Future[tuple[Result, float]]) -> None:
+        if self._discard is None or future.cancelled() or future.exception():
+            return
+        result, _ = future.result()
+        self._discard(result)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._discard is None:
+            return
+
+        for future in self._futures:
+            if future is not None:  # running ones are discarded when finished
+                future.add_done_callback(self._discard_result)
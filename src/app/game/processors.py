@@ -12,11 +12,9 @@ class QuestionProcessor:
 
         match (input_.validated, input_.option_name):
             case (1, "PLAY_SAMPLE"):
-                game.current_song.play_sample()
-                game.current_player.help_usage.repeats.decrement()
+                game.play_sample()
             case (2, "GET_A_CLUE"):
-                game.current_song.play_clue()
-                game.current_player.help_usage.clues.decrement()
+                game.play_clue()
             case (3, "GIVE_ANSWER"):
                 state.stage = Stage.GAME.value.ANSWER
             case _:
@@ -27,7 +25,7 @@ class AnswerProcessor:
     def process(self, input_: Input, step_number: int = 0) -> None:
         state = get_state()
 
-        state.game.current_song.answer.give_answer(input_.validated)
+        state.game.give_answer(input_.validated)
         state.stage = Stage.GAME.value.EVALUATION_
 
 
@@ -44,13 +42,13 @@ class EvaluationProcessor:
             case (2, "LISTEN_TO_ENTIRE_SONG"):
                 state.game.current_song.play()
             case (3, "EVALUATE_AS_CORRECT_ANSWER"):
-                state.game.current_song.answer.evaluate(Evaluation.FULL_ANSWER)
+                state.game.evaluate(Evaluation.FULL_ANSWER)
             case (4, "EVALUATE_AS_HALF_CORRECT_ANSWER"):
-                state.game.current_song.answer.evaluate(Evaluation.HALF_ANSWER)
+                state.game.evaluate(Evaluation.HALF_ANSWER)
             case (5, "EVALUATE_AS_WRONG_ANSWER"):
-                state.game.current_song.answer.evaluate(Evaluation.WRONG_ANSWER)
+                state.game.evaluate(Evaluation.WRONG_ANSWER)
             case (6, "EVALUATE_AS_NO_ANSWER"):
-                state.game.current_song.answer.evaluate(Evaluation.NO_ANSWER)
+                state.game.evaluate(Evaluation.NO_ANSWER)
             case _:
                 raise ValueError("Invalid input.")
 
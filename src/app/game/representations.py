@@ -10,6 +10,33 @@ from app.cli.formatters import Style, TemplateString
 # rewrite as functions, not dataclasses?.. maybe no
 
 
+@dataclass(frozen=True, slots=True)
+class LibraryStats:
+    tracks_number: int
+    artists_number: int
+    albums_number: int
+    total_length: int  # in ms
+    formats: dict[str, int]
+    top_artists: list[tuple[str, int]]
+
+    @property
+    def representation(self) -> str:
+        hours, seconds = divmod(self.total_length // 1000, 3600)
+        formats = ", ".join(f"{name}: {n}" for name, n in self.formats.items())
+        stats_repr = (
+            f"\t{self.artists_number} artists, {self.albums_number} albums, "
+            f"{hours} h {seconds // 60} min in total.\n"
+            f"\tFormats: {formats}.\n"
+        )
+        if self.top_artists:
+            top_artists = ", ".join(f"{name} ({n})" for name, n in self.top_artists)
+            stats_repr += f"\tMost tracks by: {top_artists}.\n"
+        return stats_repr
+
+    def __str__(self):
+        return self.representation
+
+
 @dataclass
 class ScoreItem:
     player_id: int
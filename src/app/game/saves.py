@@ -0,0 +1,134 @@
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Self
+
+from app.exceptions import InvalidGameFileError
+
+
+SAVE_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class AnswerSave:
+    answer_prompt: str
+    clues_used: int
+    evaluation: str
+    score: float
+
+
+@dataclass(frozen=True, slots=True)
+class SongSave:
+    """
+    Reference to a song: audio is not saved, only what is needed to decode it again.
+    Start times and gain are None for songs which were not played before saving,
+    such songs are prepared again from their seed.
+    """
+
+    path: str
+    format: str
+    content_hash: str
+    metadata: dict[str, Any]
+    seed: int
+    start_times: list[int] | None = None
+    gain: float | None = None
+    last_clue_number: int = -1
+    answer: AnswerSave | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        answer = data.pop("answer", None)
+        return cls(**data, answer=AnswerSave(**answer) if answer else None)
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerSave:
+    id: int
+    name: str
+    library_path: str | None
+    repeats_left: int
+    clues_left: int
+    songs: list[SongSave]  # for all rounds, in the order of rounds
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        songs = [SongSave.from_dict(song) for song in data.pop("songs")]
+        return cls(**data, songs=songs)
+
+
+@dataclass(frozen=True, slots=True)
+class GameSave:
+    rounds: int
+    status: str
+    turn: int  # number of turns passed
+    sampling: dict[str, Any]
+    players: list[PlayerSave]
+    journal_number: int = 0  # of the last journal entry included in the save
+    version: int = field(default=SAVE_FORMAT_VERSION)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        if (version := data.get("version")) != SAVE_FORMAT_VERSION:
+            raise InvalidGameFileError(f"Not supported version of save file: {version}")
+        players = [PlayerSave.from_dict(player) for player in data.pop("players")]
+        return cls(**data, players=players)
+
+
+def _fsync_dir(dir_path: str) -> None:
+    """
+    Make the renaming of a file in the directory durable.
+    """
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:  # directories cannot be opened on some systems
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_save(path: str | Path, save: GameSave, fsync: bool = True) -> None:
+    """
+    Write the save atomically, so a crash does not leave a broken save file.
+    With `fsync` the save is on disk when this returns,
+    so events journaled before it can be dropped.
+    """
+    dir_path = os.path.dirname(os.path.abspath(path))
+    with NamedTemporaryFile(
+        "w", encoding="utf-8", dir=dir_path, suffix=".tmp", delete=False
+    ) as file:
+        json.dump(asdict(save), file, ensure_ascii=False, separators=(",", ":"))
+        if fsync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(file.name, path)
+    if fsync:
+        _fsync_dir(dir_path)
+
+
+def read_save(path: str | Path) -> GameSave | None:
+    try:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        raise InvalidGameFileError(f"Failed to read save file {path}: {e}") from e
+
+    try:
+        return GameSave.from_dict(data)
+    except (KeyError, TypeError) as e:
+        raise InvalidGameFileError(f"Invalid save file {path}: {e}") from e
+
+
+def delete_save(path: str | Path) -> None:
+    """
+    Delete the save of a finished game, so there is nothing to resume.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
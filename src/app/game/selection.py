@@ -22,13 +22,19 @@ def get_indexes_of_maximums_in_list(list_object: list[Any]) -> list[int]:
 class SongSelectionStrategy(Protocol):
     """
     Returns a list of random audiofile from given list of audiofiles.
+
+    `required_fields` are fields of metadata used by the strategy:
+    if it is empty, tags of audiofiles are not read before the selection.
     """
 
+    required_fields: frozenset[str]
+
     def __call__(
         self,
         audiofiles: Sequence["Audiofile"],
         quantity: int,
-    ) -> list["Audiofile"]: ...
+    ) -> list["Audiofile"]:
+        ...
 
 
 class NaiveSongSelectionStrategy:
@@ -38,6 +44,7 @@ class NaiveSongSelectionStrategy:
     """
 
     literal: str = "naive"
+    required_fields: frozenset[str] = frozenset()
 
     def __call__(
         self, audiofiles: Sequence["Audiofile"], quantity: int
@@ -78,6 +85,7 @@ class NormalizedByFolderSongSelectionStrategy:
     """
 
     literal: str = "normalized_by_folder"
+    required_fields: frozenset[str] = frozenset()
 
     def __call__(
         self, audiofiles: Sequence["Audiofile"], quantity: int
@@ -100,6 +108,7 @@ class NormalizedByAlbumSongSelectionStrategy:
     """
 
     literal: str = "normalized_by_album"
+    required_fields: frozenset[str] = frozenset({"album"})
 
     def __call__(
         self, audiofiles: Sequence["Audiofile"], quantity: int
@@ -130,6 +139,7 @@ class RandomTimesStrategy(ABC):
     quantity: int
     start: int = 0
     end_cut: int = 0
+    rng: random.Random
 
     literal: str | None = None
 
@@ -141,7 +151,10 @@ class RandomTimesStrategy(ABC):
         quantity: int,
         start: int = 0,
         end_cut: int = 0,
+        rng: random.Random | None = None,
     ):
+        # own generator, so seeding it does not touch the global one
+        self.rng = rng or random.Random()
         self.length = length  # full length of the track
         self.distance = distance  # minimal distance between samples
         self.quantity = quantity  # number of samples to select
@@ -180,13 +193,14 @@ class RandomTimesStrategy(ABC):
                 raise e
 
     def fallback_algorithm(self, quantity: int) -> list[int]:
-        return [random.randrange(self.start, self.end) for _ in range(quantity)]
+        return [self.rng.randrange(self.start, self.end) for _ in range(quantity)]
 
     def fallback_algorithm_for_full_length(self, quantity: int) -> list[int]:
-        return [random.randrange(self.length) for _ in range(quantity)]
+        return [self.rng.randrange(self.length) for _ in range(quantity)]
 
     @abstractmethod
-    def __call__(self) -> list[int]: ...
+    def __call__(self) -> list[int]:
+        ...
 
 
 class NaiveRandomTimesStrategy(RandomTimesStrategy):
@@ -205,7 +219,7 @@ class NaiveRandomTimesStrategy(RandomTimesStrategy):
         timestamps = []
         for _ in range(self.quantity):
             for i in range(25):
-                sample_start_time = random.randrange(self.start, self.end)
+                sample_start_time = self.rng.randrange(self.start, self.end)
 
                 is_remote_enough = True
                 for timestamp in timestamps:  # check distance to other timestamps
@@ -239,7 +253,7 @@ class NormalizedRandomTimesStrategy(RandomTimesStrategy):
 
         timestamps = []
         while segment_end < self.end:
-            timestamp = random.randrange(segment_start, segment_end)
+            timestamp = self.rng.randrange(segment_start, segment_end)
             timestamps.append(timestamp)
             segment_start, segment_end = segment_end, segment_end + step
 
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from app.files.formats import is_rejected_by_extension
+from app.files.walker import IGNORE_FILE_NAME, LibraryWalker, ProgressCallback
+from app.library.loaders import ParallelLoader
+from app.library.records import COLUMNS, FileSignature, TrackRecord
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    format TEXT,
+    title TEXT,
+    artist TEXT,
+    album TEXT,
+    year INTEGER,
+    track_number INTEGER,
+    length INTEGER
+)
+"""
+
+
+def path_prefix_bounds(path: str) -> tuple[str, str]:
+    """
+    Bounds of the range of paths nested in the given path, when sorted as strings.
+    """
+    lower = os.path.join(path, "")
+    upper = lower[:-1] + chr(ord(lower[-1]) + 1)
+    return lower, upper
+
+
+def _is_not_rejected(entry: os.DirEntry) -> bool:
+    return not is_rejected_by_extension(entry.name)
+
+
+class LibraryIndex:
+    """
+    Persistent index of audiofiles stored in SQLite database.
+
+    Rescan of the library reads only files which are new or whose
+    (size, mtime, inode) signature has changed since the last scan,
+    deleted files are dropped from the index in the same pass.
+    Tags may be skipped during the scan: such audiofiles are stored
+    without tags and are read again only when tags are requested.
+    """
+
+    __slots__ = ("_db_path", "_loader")
+
+    def __init__(
+        self, db_path: str | Path, loader: ParallelLoader | None = None
+    ) -> None:
+        self._db_path = str(db_path)
+        self._loader = loader or ParallelLoader(workers=1)
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path)
+
+    def _load_signatures(
+        self, connection: sqlite3.Connection, root: str
+    ) -> dict[str, FileSignature]:
+        rows = connection.execute(
+            "SELECT path, size, mtime_ns, inode FROM files "
+            "WHERE path >= ? AND path < ?",
+            path_prefix_bounds(root),
+        )
+        return {
+            path: FileSignature(size=size, mtime_ns=mtime_ns, inode=inode)
+            for path, size, mtime_ns, inode in rows
+        }
+
+    def _load_untagged_paths(
+        self, connection: sqlite3.Connection, root: str
+    ) -> set[str]:
+        rows = connection.execute(
+            "SELECT path FROM files WHERE path >= ? AND path < ? "
+            "AND format IS NOT NULL AND length IS NULL",
+            path_prefix_bounds(root),
+        )
+        return {path for (path,) in rows}
+
+    def _load_records(
+        self, connection: sqlite3.Connection, root: str
+    ) -> list[TrackRecord]:
+        rows = connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM files "
+            "WHERE path >= ? AND path < ? AND format IS NOT NULL ORDER BY path",
+            path_prefix_bounds(root),
+        )
+        return [TrackRecord.from_row(row) for row in rows]
+
+    def scan(
+        self,
+        root: str | Path,
+        *,
+        skip_hidden: bool = True,
+        ignore_file_name: str = IGNORE_FILE_NAME,
+        on_progress: ProgressCallback | None = None,
+        with_tags: bool = True,
+    ) -> list[TrackRecord]:
+        """
+        Reconcile the index with the directory tree and return all its audiofiles.
+        Without tags only formats of new and changed files are detected.
+        """
+        root = os.path.abspath(root)
+        walker = LibraryWalker(
+            root,
+            accept=_is_not_rejected,
+            skip_hidden=skip_hidden,
+            ignore_file_name=ignore_file_name,
+            on_progress=on_progress,
+        )
+
+        with closing(self._connect()) as connection, connection:
+            known = self._load_signatures(connection, root)
+            untagged = set()
+            if with_tags:
+                untagged = self._load_untagged_paths(connection, root)
+
+            seen, changed = set(), []
+            for entry in walker:
+                try:
+                    signature = FileSignature.from_stat(entry.stat())
+                except OSError:
+                    continue
+                seen.add(entry.path)
+                if known.get(entry.path) != signature or entry.path in untagged:
+                    changed.append((entry.path, signature))
+
+            rows = self._loader.load_rows(changed, with_tags=with_tags)
+            deleted = [(path,) for path in known.keys() - seen]
+
+            connection.executemany(
+                f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+            connection.executemany("DELETE FROM files WHERE path = ?", deleted)
+
+            return self._load_records(connection, root)
@@ -0,0 +1,128 @@
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import StrEnum, auto
+from functools import partial
+from itertools import batched, chain
+from typing import Any, Callable, Iterable, TypeVar
+
+from app.files.formats import AllowedFormats
+from app.files.probe import read_tags
+from app.library.records import FileSignature, read_row, Row
+
+
+logger = logging.getLogger(__name__)
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+
+class ExecutorType(StrEnum):
+    PROCESS = auto()  # for CPU-bound tags parsing on local disks
+    THREAD = auto()  # for I/O-bound reading from network shares
+
+
+@dataclass(frozen=True, slots=True)
+class LoadingReport:
+    files_number: int
+    seconds: float
+
+    @property
+    def files_per_second(self) -> float:
+        if not self.seconds:
+            return float(self.files_number)
+        return self.files_number / self.seconds
+
+    def __str__(self):
+        return (
+            f"{self.files_number} files read in {self.seconds:.2f} s "
+            f"({self.files_per_second:.1f} files/sec)"
+        )
+
+
+def _read_rows_chunk(
+    chunk: tuple[tuple[str, FileSignature], ...], with_tags: bool = True
+) -> list[Row]:
+    return [read_row(path, signature, with_tags) for path, signature in chunk]
+
+
+def _read_tags_chunk(
+    chunk: tuple[tuple[str, AllowedFormats], ...]
+) -> list[dict[str, Any]]:
+    return [read_tags(path, format_) for path, format_ in chunk]
+
+
+class ParallelLoader:
+    """
+    Reads formats and tags of audiofiles in chunks on a pool of workers.
+    Results are returned in the same order as the given files.
+    """
+
+    __slots__ = ("_workers", "_executor_type", "_chunk_size", "last_report")
+
+    def __init__(
+        self,
+        *,
+        workers: int = 0,
+        executor_type: ExecutorType = ExecutorType.PROCESS,
+        chunk_size: int = 64,
+    ) -> None:
+        self._workers = workers or os.cpu_count() or 1
+        self._executor_type = ExecutorType(executor_type)
+        self._chunk_size = chunk_size
+
+        self.last_report: LoadingReport | None = None
+
+    def _executor(self) -> Executor:
+        match self._executor_type:
+            case ExecutorType.PROCESS:
+                return ProcessPoolExecutor(max_workers=self._workers)
+            case ExecutorType.THREAD:
+                return ThreadPoolExecutor(max_workers=self._workers)
+
+    def _map_chunks(
+        self,
+        read_chunk: Callable[[tuple[Item, ...]], list[Result]],
+        items: Iterable[Item],
+    ) -> list[Result]:
+        start_time = time.perf_counter()
+
+        chunks = list(batched(items, self._chunk_size))
+        if self._workers == 1 or len(chunks) <= 1:
+            results = list(chain.from_iterable(map(read_chunk, chunks)))
+        else:
+            with self._executor() as executor:
+                results = list(chain.from_iterable(executor.map(read_chunk, chunks)))
+
+        self.last_report = LoadingReport(
+            files_number=len(results),
+            seconds=time.perf_counter() - start_time,
+        )
+        if results:
+            logger.info(
+                "%s with %d %s workers",
+                self.last_report,
+                self._workers,
+                self._executor_type,
+            )
+
+        return results
+
+    def load_rows(
+        self, files: Iterable[tuple[str, FileSignature]], *, with_tags: bool = True
+    ) -> list[Row]:
+        """
+        Read rows of the index for given files with their signatures.
+        Without tags only formats of files are detected.
+        """
+        return self._map_chunks(partial(_read_rows_chunk, with_tags=with_tags), files)
+
+    def load_tags(
+        self, files: Iterable[tuple[str, AllowedFormats]]
+    ) -> list[dict[str, Any]]:
+        """
+        Read tags of audiofiles of already known formats.
+        """
+        return self._map_chunks(_read_tags_chunk, files)
@@ -0,0 +1,323 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from itertools import batched
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, Callable, Iterable, TypeAlias
+
+from app.exceptions import DecodingError, InvalidPackFileError
+from app.files.cache import content_hash
+from app.files.decoding import decode_full, PcmFormat, SAMPLE_WIDTH, Window
+from app.files.segments import PlayableSegment
+
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"SRPACK"
+_VERSION = 2
+# magic, version, sample rate, channels, number of tracks, offset of the table
+_HEADER = struct.Struct("<6sHIHQQ")
+# content hash, offset of PCM in bytes, number of frames, peak in dBFS
+_ENTRY = struct.Struct("<16sQQd")
+
+PackEntries: TypeAlias = dict[str, tuple[int, int, float]]
+
+
+@dataclass(frozen=True, slots=True)
+class PackProgress:
+    tracks_done: int
+    tracks_number: int
+
+    @property
+    def is_finished(self) -> bool:
+        return self.tracks_done == self.tracks_number
+
+    def __str__(self):
+        return f"{self.tracks_done}/{self.tracks_number}"
+
+
+PackProgressCallback: TypeAlias = Callable[[PackProgress], None]
+
+
+def _read_pack(path: str) -> tuple[PcmFormat, PackEntries, mmap.mmap]:
+    try:
+        with open(path, "rb") as file:
+            map_ = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:  # ValueError for an empty file
+        raise InvalidPackFileError(f"Failed to read proxy pack {path}: {e}") from e
+
+    try:
+        (
+            magic,
+            version,
+            sample_rate,
+            channels,
+            number,
+            table_offset,
+        ) = _HEADER.unpack_from(map_)
+        table = map_[table_offset : table_offset + number * _ENTRY.size]
+        entries = {
+            digest.hex(): (offset, frames, peak)
+            for digest, offset, frames, peak in _ENTRY.iter_unpack(table)
+        }
+    except struct.error as e:
+        map_.close()
+        raise InvalidPackFileError(f"Invalid proxy pack {path}: {e}") from e
+
+    if magic != _MAGIC or version != _VERSION:
+        map_.close()
+        raise InvalidPackFileError(f"Not supported version of proxy pack: {path}")
+
+    return PcmFormat(sample_rate=sample_rate, channels=channels), entries, map_
+
+
+class ProxyPack:
+    """
+    Full tracks of libraries decoded once to one PCM format and stored in one file,
+    memory-mapped, so windows of samples are sliced out of it without ffmpeg.
+
+    Tracks are found by the content of audiofiles, as in the samples cache.
+    Peaks of tracks are kept in the table, so songs are normalized without
+    reading whole tracks.
+    The file is mapped on the first use, so the pack is cheap to send
+    to other processes: each of them maps the file by itself.
+    """
+
+    __slots__ = ("_path", "_pcm_format", "_entries", "_map")
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = str(path)
+        self._pcm_format: PcmFormat | None = None
+        self._entries: PackEntries = {}
+        self._map: mmap.mmap | None = None
+
+    def __reduce__(self):
+        return type(self), (self._path,)
+
+    def _open(self) -> mmap.mmap:
+        if self._map is None:
+            self._pcm_format, self._entries, self._map = _read_pack(self._path)
+        return self._map
+
+    @property
+    def pcm_format(self) -> PcmFormat:
+        self._open()
+        return self._pcm_format
+
+    def __len__(self) -> int:
+        self._open()
+        return len(self._entries)
+
+    def __contains__(self, file_hash: str) -> bool:
+        self._open()
+        return file_hash in self._entries
+
+    def track(self, file_hash: str) -> PlayableSegment | None:
+        """
+        Packed track as a view of the mapped file, None if it is not packed.
+        """
+        map_ = self._open()
+        if (entry := self._entries.get(file_hash)) is None:
+            return None
+
+        offset, frames, _ = entry
+        size = frames * self._pcm_format.channels * SAMPLE_WIDTH
+        return PlayableSegment.from_pcm(
+            memoryview(map_)[offset : offset + size],
+            frame_rate=self._pcm_format.sample_rate,
+            channels=self._pcm_format.channels,
+        )
+
+    def peak(self, file_hash: str) -> float | None:
+        """
+        Peak of the packed track in dBFS, None if it is not packed.
+        """
+        self._open()
+        if (entry := self._entries.get(file_hash)) is None:
+            return None
+        return entry[2]
+
+    def windows(
+        self,
+        path: str | Path,
+        windows: list[Window],
+        pcm_format: PcmFormat,
+        file_hash: str | None = None,
+    ) -> list[PlayableSegment] | None:
+        """
+        Windows of the audiofile in `pcm_format`, sliced out of the pack.
+        None if the file is not packed or is packed at another sample rate.
+        Stereo tracks are downmixed if mono windows are requested.
+        The file is hashed only if its `file_hash` is not known yet.
+        """
+        packed_format = self.pcm_format
+        if packed_format.sample_rate != pcm_format.sample_rate or (
+            packed_format.channels < pcm_format.channels
+        ):
+            return None
+        if (track := self.track(file_hash or content_hash(path))) is None:
+            return None
+
+        segments = [track[w.start : w.start + w.duration] for w in windows]
+        if packed_format.channels > pcm_format.channels:
+            segments = [segment.to_mono() for segment in segments]
+        return segments
+
+    def close(self) -> None:
+        if self._map is None:
+            return
+        try:
+            self._map.close()
+        except BufferError:  # segments still refer to it, it is unmapped with them
+            pass
+        self._map = None
+
+
+@dataclass(frozen=True, slots=True)
+class PackReport:
+    tracks_number: int
+    reused_number: int
+    failed_number: int
+    size: int  # in bytes
+    seconds: float
+
+    def __str__(self):
+        return (
+            f"{self.tracks_number} tracks packed "
+            f"({self.reused_number} taken from the previous pack, "
+            f"{self.failed_number} failed) into {self.size / 2**20:.1f} MB "
+            f"in {self.seconds:.1f} s"
+        )
+
+
+def _previous_pack(path: str | Path, pcm_format: PcmFormat) -> ProxyPack | None:
+    if not os.path.exists(path):
+        return None
+
+    pack = ProxyPack(path)
+    try:
+        if pack.pcm_format == pcm_format:
+            return pack
+    except InvalidPackFileError as e:
+        logger.warning("Previous proxy pack is not reused: %s", e)
+    return None
+
+
+def _decode_track(path: str, pcm_format: PcmFormat) -> PlayableSegment | None:
+    try:
+        return decode_full(path, pcm_format=pcm_format)
+    except DecodingError as e:
+        logger.warning("Failed to pack %s: %s", path, e)
+        return None
+
+
+def _write_pack(
+    file: BinaryIO,
+    tracks: dict[str, str],
+    pcm_format: PcmFormat,
+    previous: ProxyPack | None,
+    workers: int,
+    on_progress: PackProgressCallback | None,
+) -> tuple[int, int]:
+    file.write(bytes(_HEADER.size))  # written when the table is known
+    entries: PackEntries = {}
+    offset = _HEADER.size
+
+    def append(file_hash: str, segment: PlayableSegment, peak: float) -> None:
+        nonlocal offset
+        data = segment.raw_data
+        file.write(data)
+        entries[file_hash] = (offset, segment.frames, peak)
+        offset += len(data)
+
+    to_decode, reused = [], 0
+    for file_hash, path in tracks.items():
+        if previous is not None and (track := previous.track(file_hash)) is not None:
+            append(file_hash, track, previous.peak(file_hash))
+            reused += 1
+        else:
+            to_decode.append((file_hash, path))
+
+    tracks_done = reused
+    decode = partial(_decode_track, pcm_format=pcm_format)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # in batches, so only `workers` decoded tracks are kept in memory at once
+        for batch in batched(to_decode, workers):
+            segments = executor.map(decode, [path for _, path in batch])
+            for (file_hash, _), segment in zip(batch, segments):
+                if segment is not None:
+                    append(file_hash, segment, segment.max_dBFS)
+            tracks_done += len(batch)
+            if on_progress is not None:
+                on_progress(PackProgress(tracks_done, len(tracks)))
+
+    for file_hash, (track_offset, frames, peak) in entries.items():
+        file.write(_ENTRY.pack(bytes.fromhex(file_hash), track_offset, frames, peak))
+    file.seek(0)
+    file.write(
+        _HEADER.pack(
+            _MAGIC,
+            _VERSION,
+            pcm_format.sample_rate,
+            pcm_format.channels,
+            len(entries),
+            offset,
+        )
+    )
+    return len(entries), reused
+
+
+def build_pack(
+    path: str | Path,
+    audiofiles: Iterable[str | Path],
+    pcm_format: PcmFormat,
+    workers: int = 1,
+    on_progress: PackProgressCallback | None = None,
+) -> PackReport:
+    """
+    Decode audiofiles once to `pcm_format` and write them into a new pack,
+    which replaces the previous one atomically. Tracks packed in the previous
+    pack in the same format are copied from it instead of being decoded again,
+    so rebuilding the pack after changes of libraries decodes only new files.
+    Up to `workers` ffmpeg processes decode tracks at once.
+    """
+    started_at = time.perf_counter()
+
+    tracks: dict[str, str] = {}  # by content hash, so copies are packed once
+    failed = 0
+    for audiofile in audiofiles:
+        try:
+            tracks.setdefault(content_hash(audiofile), str(audiofile))
+        except OSError as e:
+            logger.warning("Failed to pack %s: %s", audiofile, e)
+            failed += 1
+
+    previous = _previous_pack(path, pcm_format)
+    dir_path = os.path.dirname(os.path.abspath(path))
+    with NamedTemporaryFile("wb", dir=dir_path, suffix=".tmp", delete=False) as file:
+        try:
+            packed, reused = _write_pack(
+                file, tracks, pcm_format, previous, max(workers, 1), on_progress
+            )
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+
+    if previous is not None:
+        previous.close()
+    os.replace(file.name, path)
+
+    return PackReport(
+        tracks_number=packed,
+        reused_number=reused,
+        failed_number=failed + len(tracks) - packed,
+        size=os.path.getsize(path),
+        seconds=time.perf_counter() - started_at,
+    )
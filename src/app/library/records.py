@@ -0,0 +1,99 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Self, TypeAlias
+
+from app.files.formats import AllowedFormats, detect_format
+from app.files.probe import read_tags, TAGS_FIELDS
+
+
+Row: TypeAlias = tuple[Any, ...]
+
+COLUMNS = ("path", "size", "mtime_ns", "inode", "format", *TAGS_FIELDS, "length")
+
+
+@dataclass(frozen=True, slots=True)
+class FileSignature:
+    """
+    Cheap fingerprint of a file on disk: if it is unchanged,
+    the file is considered unchanged since the last scan.
+    """
+
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def from_stat(cls, stat: os.stat_result) -> Self:
+        return cls(size=stat.st_size, mtime_ns=stat.st_mtime_ns, inode=stat.st_ino)
+
+
+@dataclass(frozen=True, slots=True)
+class TrackRecord:
+    """
+    Indexed audiofile: its format, tags and length in ms.
+    Tags and length are None if they were not read during the scan.
+    """
+
+    path: str
+    format: AllowedFormats
+    title: str | None
+    artist: str | None
+    album: str | None
+    year: int | None
+    track_number: int | None
+    length: int | None
+
+    @property
+    def has_tags(self) -> bool:
+        return self.length is not None
+
+    @property
+    def tags(self) -> dict[str, Any]:
+        return {fld: getattr(self, fld) for fld in (*TAGS_FIELDS, "length")}
+
+    @classmethod
+    def from_row(cls, row: Row) -> Self:
+        path, _, _, _, format_, *tags, length = row
+        return cls(path, AllowedFormats(format_), *tags, length)
+
+
+def is_audio_row(row: Row) -> bool:
+    return row[COLUMNS.index("format")] is not None
+
+
+def read_row(path: str, signature: FileSignature, with_tags: bool = True) -> Row:
+    """
+    Read the file and make a row of the index out of it.
+    Files of not supported formats are stored without format and tags,
+    so they are not sniffed again until changed.
+    """
+    empty_tags = (None,) * (len(TAGS_FIELDS) + 1)
+    if (format_ := detect_format(path)) is None:
+        return (
+            path,
+            signature.size,
+            signature.mtime_ns,
+            signature.inode,
+            None,
+            *empty_tags,
+        )
+    if not with_tags:
+        return (
+            path,
+            signature.size,
+            signature.mtime_ns,
+            signature.inode,
+            format_.value,
+            *empty_tags,
+        )
+
+    tags = read_tags(path, format_)
+    return (
+        path,
+        signature.size,
+        signature.mtime_ns,
+        signature.inode,
+        format_.value,
+        *(tags[fld] for fld in TAGS_FIELDS),
+        tags["length"],
+    )
@@ -0,0 +1,130 @@
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Generic, Iterator, overload, TypeVar
+
+from app.library.index import path_prefix_bounds
+
+
+Item = TypeVar("Item")
+
+
+class LibraryView(Sequence[Item]):
+    """
+    Read-only view of a slice of a shared library, made without copying items.
+    """
+
+    __slots__ = ("_items", "_start", "_stop")
+
+    def __init__(self, items: Sequence[Item], start: int = 0, stop: int | None = None):
+        self._items = items
+        self._start = start
+        self._stop = len(items) if stop is None else stop
+
+    @property
+    def source(self) -> Sequence[Item]:
+        return self._items
+
+    @property
+    def rows(self) -> range:
+        """
+        Indexes of items of the source which are in the view.
+        """
+        return range(self._start, self._stop)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> Item:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "LibraryView[Item]":
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("Views support only contiguous slices")
+            return LibraryView(self._items, self._start + start, self._start + stop)
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Library view index out of range")
+        return self._items[self._start + index]
+
+    def __iter__(self) -> Iterator[Item]:
+        for i in range(self._start, self._stop):
+            yield self._items[i]
+
+
+class LibraryRegistry(ABC, Generic[Item]):
+    """
+    Registry of libraries shared by all players.
+
+    Every physical directory is scanned once: players' paths which are
+    the same or nested in the path of another player are served
+    as views of the catalog of the outermost directory which includes them.
+    Paths pruned by the scan of an outer directory are scanned on their own.
+    """
+
+    __slots__ = ("_roots", "_catalogs")
+
+    def __init__(self) -> None:
+        self._roots: set[str] = set()
+        self._catalogs: dict[str, Sequence[Item]] = {}
+
+    @abstractmethod
+    def load(self, root: str) -> Sequence[Item]:
+        """
+        Load all items of the directory tree, sorted by their paths.
+        """
+        ...
+
+    @abstractmethod
+    def path_of(self, item: Item) -> str:
+        ...
+
+    def includes(self, root: str, path: str) -> bool:
+        """
+        Check if the scan of `root` reaches the directory `path` nested in it.
+        """
+        return True
+
+    def register(self, *paths: str | Path) -> None:
+        """
+        Register paths before views are requested,
+        so nested libraries are detected before scanning.
+        """
+        self._roots.update(os.path.realpath(path) for path in paths if path)
+
+    def _root_of(self, path: str) -> str:
+        containing_roots = [
+            root
+            for root in self._roots
+            if path == root
+            or (path.startswith(os.path.join(root, "")) and self.includes(root, path))
+        ]
+        return min(containing_roots, key=len)
+
+    def view(self, path: str | Path) -> LibraryView[Item]:
+        path = os.path.realpath(path)
+        self.register(path)
+
+        root = self._root_of(path)
+        if root not in self._catalogs:
+            self._catalogs[root] = self.load(root)
+        catalog = self._catalogs[root]
+
+        if path == root:
+            return LibraryView(catalog)
+
+        lower, upper = path_prefix_bounds(path)
+        start = bisect_left(catalog, lower, key=self.path_of)
+        stop = bisect_left(catalog, upper, lo=start, key=self.path_of)
+        return LibraryView(catalog, start, stop)
@@ -1,6 +1,7 @@
 from sys import exit
 
 from app.cli.exceptions import InvalidInputError
+from app.game.models import build_proxy_pack
 from app.navigation.factories import menu_factory
 from app.state import get_state, Stage
 
@@ -74,5 +75,10 @@ def entrypoint():
     main()
 
 
+def build_pack_entrypoint():
+    report = build_proxy_pack()
+    print(report)
+
+
 if __name__ == "__main__":
     entrypoint()
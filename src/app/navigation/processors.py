@@ -50,6 +50,20 @@ class LibrariesStatsProcessor:
             stats_repr = getattr(player, mapping[repr_type])()
             state.viewer.display(TemplateString(f"$clr_{i + 1}{stats_repr}\n"))
 
+            if repr_type == "extended":
+                LibrariesStatsProcessor._display_pages(player, color_number=i + 1)
+
+    @staticmethod
+    def _display_pages(player: Player, color_number: int) -> None:
+        state = get_state()
+        page_size = state.settings.display.stats_page_size
+
+        for page in player.iter_library_pages(page_size):
+            page = page.replace("$", "$$")
+            state.viewer.print(TemplateString(f"$clr_{color_number}{page}\n"))
+            if input("Press ENTER for the next page or Q to stop. ").lower() == "q":
+                break
+
     def process(self, input_: Input, step_number: int = 0) -> None:
         assert isinstance(input_.validated, int), "Invalid input."
 
@@ -134,9 +148,15 @@ class AdvancedSettingsProcessor:
                 state.stage = Stage.ADVANCED_SETTINGS.value.PLAYBACK_BAR
             case (5, "EVALUATION"):
                 state.stage = Stage.ADVANCED_SETTINGS.value.EVALUATION
-            case (6, "SERVICE_PATHS"):
+            case (6, "LIBRARY"):
+                state.stage = Stage.ADVANCED_SETTINGS.value.LIBRARY
+            case (7, "AUDIO"):
+                state.stage = Stage.ADVANCED_SETTINGS.value.AUDIO
+            case (8, "AUTOSAVE"):
+                state.stage = Stage.ADVANCED_SETTINGS.value.AUTOSAVE
+            case (9, "SERVICE_PATHS"):
                 state.stage = Stage.ADVANCED_SETTINGS.value.SERVICE_PATHS
-            case (7, "BACK"):
+            case (10, "BACK"):
                 state.stage = Stage.SETTINGS.value.ALL_SETTINGS
             case _:
                 raise ValueError("Invalid input.")
@@ -8,8 +8,8 @@ def make_main_menu_step():
     state = get_state()
 
     resume_option = []
-    game_pickle_path = state.settings.service_paths.game_pickle_path
-    if os.path.exists(game_pickle_path):
+    game_save_path = state.settings.service_paths.game_save_path
+    if os.path.exists(game_save_path):
         resume_option.append("resume")
 
     libraries_stats_option = []
@@ -47,11 +47,11 @@ SETTINGS_MENU = MenuStep(
 
 def make_libraries_stats_step():
     state = get_state()
-    game_pickle_path = state.settings.service_paths.game_pickle_path
+    game_save_path = state.settings.service_paths.game_save_path
     players = state.settings.players
 
     options = []
-    is_prev_game = os.path.exists(game_pickle_path)
+    is_prev_game = os.path.exists(game_save_path)
     is_next_game = any([player.path != "" for player in players])
     if is_prev_game and is_next_game:
         options = [
@@ -95,6 +95,9 @@ ADVANCED_SETTINGS_MENU = MenuStep(
         "sampling",
         "playback_bar",
         "evaluation",
+        "library",
+        "audio",
+        "autosave",
         "service_paths",
         "back",
     ],
@@ -65,6 +65,11 @@ SETTINGS_DICT = {
             "constrains": ">=0.0, <=0.5",
             "default": "0.05",
         },
+        "stats_page_size": {
+            "info": "number of songs shown on one page of extended libraries stats",
+            "constrains": ">=1",
+            "default": "50",
+        },
     },
     "SELECTION_SETTINGS": {
         "strategy": {
@@ -169,19 +174,139 @@ SETTINGS_DICT = {
             "default": "0.1",
         },
     },
+    "LIBRARY_SETTINGS": {
+        "workers": {
+            "info": "number of workers reading audiofiles of libraries in parallel",
+            "comment": "0 means number of CPUs",
+            "constrains": ">=0",
+            "default": "0",
+        },
+        "executor": {
+            "info": "type of workers reading audiofiles",
+            "options": {
+                "process": "separate processes, fastest for local disks",
+                "thread": "threads, suitable for slow network shares",
+            },
+            "default": "process",
+        },
+        "chunk_size": {
+            "info": "number of audiofiles given to a worker at once",
+            "constrains": ">=1",
+            "default": "64",
+        },
+        "skip_hidden": {
+            "info": "if True, hidden files and folders of libraries are skipped",
+            "default": "True",
+        },
+        "ignore_file_name": {
+            "info": "name of files with globs (one per line) of paths to skip in their folder",
+            "default": ".songignore",
+        },
+    },
+    "AUDIO_SETTINGS": {
+        "prefetch_window": {
+            "info": "number of next turns whose songs are prepared in background during the game",
+            "constrains": ">=1",
+            "default": "2",
+        },
+        "preparation_workers": {
+            "info": "number of processes preparing songs in parallel",
+            "comment": "0 means number of CPUs",
+            "constrains": ">=0",
+            "default": "0",
+        },
+        "full_tracks_memory": {
+            "info": "memory in MB for decoded full tracks, so listening to a song again does not decode it",
+            "comment": "question songs keep only their samples, full tracks over the limit are dropped",
+            "constrains": ">=0",
+            "default": "256",
+        },
+        "playback_backend": {
+            "info": "the way samples and songs are played",
+            "options": {
+                "simpleaudio": "raw audio is passed to the audio device at once",
+                "ffplay": "audio is played by ffplay from a temporary file",
+            },
+            "comment": "ffplay is used if simpleaudio fails to play audio",
+            "default": "simpleaudio",
+        },
+        "stream_full_tracks": {
+            "info": "whether full songs are played while they are decoded, starting at once",
+            "comment": "streamed songs are played with ffplay and amplified by the gain of their samples, lowered before loud parts would clip",
+            "default": "True",
+        },
+        "sample_rate": {
+            "info": "sample rate in Hz samples and full songs are decoded to, whatever the rate of their files is",
+            "comment": "22050 halves memory of prepared songs and decoding time, 16-bit PCM is always used",
+            "constrains": ">=8000, <=48000",
+            "default": "44100",
+        },
+        "mono_samples": {
+            "info": "whether samples are downmixed to mono by ffmpeg while they are decoded",
+            "comment": "full songs are always played in stereo",
+            "default": "False",
+        },
+        "use_proxy_pack": {
+            "info": "whether samples are sliced out of the proxy pack instead of being decoded by ffmpeg",
+            "comment": "the pack is built with `poetry run build-pack`, songs missing in it are decoded as usual",
+            "default": "False",
+        },
+    },
+    "AUTOSAVE_SETTINGS": {
+        "fsync": {
+            "info": "when game events written after every action are flushed to disk",
+            "options": {
+                "always": "after every event, safest",
+                "turn": "after the end of every turn",
+                "never": "when the OS decides, fastest",
+            },
+            "default": "turn",
+        },
+        "snapshot_every": {
+            "info": "number of turns between full saves of the game, events are replayed over the last one",
+            "constrains": ">=1",
+            "default": "5",
+        },
+    },
     "SERVICE_PATHS_SETTINGS": {
         "config_path": {
             "info": "path to config file, where set settings are stored",
             "default": "config.yaml",
         },
-        "game_pickle_path": {
-            "info": "path to pickle file, where unfinished game state is stored",
-            "default": "game.pickle",
+        "game_save_path": {
+            "info": "path to save file, where unfinished game state is stored",
+            "default": "game.json",
+        },
+        "game_journal_path": {
+            "info": "path to journal file, where events of the game since its last save are stored",
+            "default": "game.journal",
         },
         "history_log_path": {
             "info": "path to history log file",
             "default": "history.log",
         },
+        "library_index_path": {
+            "info": "path to index of players' libraries, so unchanged audiofiles are not read again",
+            "default": "library.sqlite",
+        },
+        "log_path": {
+            "info": "path to log file of the application",
+            "default": "app.log",
+        },
+        "sample_cache_path": {
+            "info": "path to folder with cached decoded samples, so they are not decoded again",
+            "default": "samples_cache",
+        },
+        "sample_cache_size": {
+            "info": "maximum size of cached samples in MB, least recently used samples are deleted first",
+            "comment": "0 disables the cache",
+            "constrains": ">=0",
+            "default": "256",
+        },
+        "proxy_pack_path": {
+            "info": "path to proxy pack with all audiofiles of players' libraries decoded in the format of samples",
+            "default": "proxy.pack",
+        },
     },
 }
 
@@ -197,6 +322,9 @@ type SettingDictSection = Literal[
     "SAMPLING_SETTINGS",
     "PLAYBACK_BAR_SETTINGS",
     "EVALUATION_SETTINGS",
+    "LIBRARY_SETTINGS",
+    "AUDIO_SETTINGS",
+    "AUTOSAVE_SETTINGS",
     "SERVICE_PATHS_SETTINGS",
 ]
 
@@ -64,6 +64,9 @@ _ADVANCED_SETTINGS_TEXT = f"""\
     {represent_setting("SAMPLING_SETTINGS")}
     {represent_setting("PLAYBACK_BAR_SETTINGS")}
     {represent_setting("EVALUATION_SETTINGS")}
+    {represent_setting("LIBRARY_SETTINGS")}
+    {represent_setting("AUDIO_SETTINGS")}
+    {represent_setting("AUTOSAVE_SETTINGS")}
     {represent_setting("SERVICE_PATHS_SETTINGS")}
 """
 
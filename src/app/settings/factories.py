@@ -23,6 +23,9 @@ def _settings_sections_mapping(stage: Stage) -> SettingsSection:
         Stage.ADVANCED_SETTINGS.value.SAMPLING: settings.sampling,
         Stage.ADVANCED_SETTINGS.value.PLAYBACK_BAR: settings.playback_bar,
         Stage.ADVANCED_SETTINGS.value.EVALUATION: settings.evaluation,
+        Stage.ADVANCED_SETTINGS.value.LIBRARY: settings.library,
+        Stage.ADVANCED_SETTINGS.value.AUDIO: settings.audio,
+        Stage.ADVANCED_SETTINGS.value.AUTOSAVE: settings.autosave,
         Stage.ADVANCED_SETTINGS.value.SERVICE_PATHS: settings.service_paths,
     }
 
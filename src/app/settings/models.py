@@ -6,12 +6,26 @@ from typing import Self
 from pydantic import Field, field_validator, ValidationError
 from pydantic_settings import BaseSettings
 
+from app.cli.viewers import ProgressViewer
 from app.models import OrderedModel
-from app.consts import CONFIG_FILE_PATH, HISTORY_FILE_PATH, PICKLE_FILE_PATH
-from app.files import get_audiofiles_paths
+from app.consts import (
+    CONFIG_FILE_PATH,
+    HISTORY_FILE_PATH,
+    JOURNAL_FILE_PATH,
+    LIBRARY_INDEX_FILE_PATH,
+    LOG_FILE_PATH,
+    PROXY_PACK_PATH,
+    SAVE_FILE_PATH,
+    SAMPLE_CACHE_PATH,
+)
+from app.files.walker import contains_audiofiles
 from app.utils import get_singleton_instance
 
 
+# the same callback for every check, so results of walks stay cached
+_LIBRARY_PROGRESS = ProgressViewer("Looking for audiofiles")
+
+
 class SettingsSection(OrderedModel):
     """
     Base class for all settings sections.
@@ -95,7 +109,7 @@ class PlayerSettings(SettingsSection):
         if not path:
             return path
 
-        if len(get_audiofiles_paths(path)) == 0:
+        if not contains_audiofiles(path, on_progress=_LIBRARY_PROGRESS):
             raise ValueError("Sorry, there are no supported audiofiles in this folder.")
         return path
 
@@ -125,6 +139,11 @@ class DisplaySettings(SettingsSection):
         default=0.05,
         description="Enter maximum number of seconds between two characters.",
     )
+    stats_page_size: int = Field(
+        ge=1,
+        default=50,
+        description="Enter number of songs shown on one page of libraries stats.",
+    )
 
 
 class SelectionSettings(SettingsSection):
@@ -253,6 +272,99 @@ class EvaluationSettings(SettingsSection):
     )
 
 
+class LibrarySettings(SettingsSection):
+    """
+    Settings of how players' libraries are read.
+    """
+
+    workers: int = Field(
+        ge=0,
+        default=0,
+        description="Enter the number of workers reading audiofiles, 0 for number of CPUs.",
+    )
+    executor: str = Field(
+        pattern="process|thread",
+        default="process",
+        description="Enter the type of workers from [process|thread], threads suit network shares.",
+    )
+    chunk_size: int = Field(
+        ge=1,
+        default=64,
+        description="Enter the number of audiofiles given to a worker at once.",
+    )
+    skip_hidden: bool = Field(
+        default=True,
+        description="Are hidden files and folders skipped.",
+    )
+    ignore_file_name: str = Field(
+        min_length=1,
+        default=".songignore",
+        description="Enter the name of files listing globs of paths to skip.",
+    )
+
+
+class AudioSettings(SettingsSection):
+    """
+    Settings of how songs are prepared and played.
+    """
+
+    prefetch_window: int = Field(
+        ge=1,
+        default=2,
+        description="Enter the number of next turns whose songs are prepared in background.",
+    )
+    preparation_workers: int = Field(
+        ge=0,
+        default=0,
+        description="Enter the number of processes preparing songs, 0 for number of CPUs.",
+    )
+    full_tracks_memory: int = Field(
+        ge=0,
+        default=256,
+        description="Enter the memory in MB for full tracks kept after listening to them.",
+    )
+    playback_backend: str = Field(
+        pattern="simpleaudio|ffplay",
+        default="simpleaudio",
+        description="Enter the way audio is played from [simpleaudio|ffplay].",
+    )
+    stream_full_tracks: bool = Field(
+        default=True,
+        description="Are full songs streamed from files instead of decoding them first.",
+    )
+    sample_rate: int = Field(
+        ge=8000,
+        le=48000,
+        default=44100,
+        description="Enter the sample rate in Hz all audio is decoded to, e.g. 44100 or 22050.",
+    )
+    mono_samples: bool = Field(
+        default=False,
+        description="Are samples downmixed to mono to halve their memory.",
+    )
+    use_proxy_pack: bool = Field(
+        default=False,
+        description="Are samples sliced out of the proxy pack built with build-pack.",
+    )
+
+
+class AutosaveSettings(SettingsSection):
+    """
+    Settings of how the unfinished game is saved during the game.
+    """
+
+    fsync: str = Field(
+        pattern="always|turn|never",
+        default="turn",
+        description="Enter when game events are flushed to disk from [always|turn|never].",
+    )
+    snapshot_every: int = Field(
+        ge=1,
+        default=5,
+        description="Enter the number of turns between full saves of the game.",
+    )
+
+
 class ServicePathsSettings(SettingsSection):
     """
     Settings of where to store service files.
@@ -262,14 +374,39 @@ class ServicePathsSettings(SettingsSection):
         default=str(CONFIG_FILE_PATH),
         description="Enter the path to the config file.",
     )
-    game_pickle_path: str = Field(
-        default=str(PICKLE_FILE_PATH),
-        description="Enter the path to the game pickle file.",
+    game_save_path: str = Field(
+        default=str(SAVE_FILE_PATH),
+        description="Enter the path to the game save file.",
+    )
+    game_journal_path: str = Field(
+        default=str(JOURNAL_FILE_PATH),
+        description="Enter the path to the journal of game events.",
     )
     history_log_path: str = Field(
         default=str(HISTORY_FILE_PATH),
         description="Enter the path to the history file.",
     )
+    library_index_path: str = Field(
+        default=str(LIBRARY_INDEX_FILE_PATH),
+        description="Enter the path to the library index file.",
+    )
+    log_path: str = Field(
+        default=str(LOG_FILE_PATH),
+        description="Enter the path to the log file.",
+    )
+    sample_cache_path: str = Field(
+        default=str(SAMPLE_CACHE_PATH),
+        description="Enter the path to the folder with cached samples.",
+    )
+    sample_cache_size: int = Field(
+        ge=0,
+        default=256,
+        description="Enter the maximum size of cached samples in MB, 0 to disable the cache.",
+    )
+    proxy_pack_path: str = Field(
+        default=str(PROXY_PACK_PATH),
+        description="Enter the path to the proxy pack of decoded libraries.",
+    )
 
 
 class Settings(BaseSettings):
@@ -286,16 +423,19 @@ class Settings(BaseSettings):
     sampling: SamplingSettings = Field(default=SamplingSettings())
     playback_bar: PlaybackBarSettings = Field(default=PlaybackBarSettings())
     evaluation: EvaluationSettings = Field(default=EvaluationSettings())
+    library: LibrarySettings = Field(default=LibrarySettings())
+    audio: AudioSettings = Field(default=AudioSettings())
+    autosave: AutosaveSettings = Field(default=AutosaveSettings())
     service_paths: ServicePathsSettings = Field(default=ServicePathsSettings())
 
     @classmethod
     def load_from_file(cls) -> Self:
         yaml_dict = cls.config_file_as_dict()
+        yaml_dict.setdefault("players", [])
 
         settings = cls(**yaml_dict)
 
         players_number = yaml_dict.get("game", {}).get("players_number", None)
-        settings.players = [PlayerSettings(**p) for p in yaml_dict.get("players", [])]
         if players_number and (diff := players_number - len(settings.players)) > 0:
             settings.players.extend([PlayerSettings() for _ in range(diff)])
         if players_number and (players_number - len(settings.players) < 0):
@@ -1,7 +1,9 @@
+import logging
 from enum import Enum, StrEnum, auto, member
 from typing import Any
 
-from app.game.models import Game
+from app.exceptions import NotEnoughSongsError
+from app.game.models import Game, GameStatus, get_audio_service
 from app.settings.models import get_settings, Settings
 from app.viewers import AppViewer
 from app.utils import get_singleton_instance
@@ -31,6 +33,9 @@ class Stage(Enum):
         SAMPLING = auto()
         PLAYBACK_BAR = auto()
         EVALUATION = auto()
+        LIBRARY = auto()
+        AUDIO = auto()
+        AUTOSAVE = auto()
         SERVICE_PATHS = auto()
 
     @member
@@ -48,6 +53,11 @@ class State:
         self._stage: Stage = Stage.MAIN_MENU
         self._previous_stage: Stage | None = None
         self._settings: Settings = get_settings().load_from_file()
+        logging.basicConfig(
+            filename=self._settings.service_paths.log_path,
+            format="%(asctime)s %(name)s %(levelname)s: %(message)s",
+            level=logging.INFO,
+        )
         self._game: Game = Game.from_settings()
         self.data: dict[str, Any] = {}
 
@@ -79,20 +89,29 @@ class State:
         return self._viewer
 
     def restart_game(self) -> None:
-        self._game.initialize_songs()
-        self._game.status = "in_progress"
+        self._game.status = GameStatus.IN_PROGRESS
+        try:
+            self._game.initialize_songs()
+        except NotEnoughSongsError as e:
+            self._game.status = GameStatus.NOT_STARTED
+            self.viewer.display(f"{e}. Add audiofiles or play fewer rounds.\n")
+            return
         self._viewer = self._viewer.refreshed()
         self.stage = Stage.GAME.value.QUESTION
 
     def resume_game(self) -> None:
-        self._game = Game.from_pickle()
+        self._game = Game.load_from_file()
         self._viewer = self._viewer.refreshed()
         self.stage = Stage.GAME.value.QUESTION
 
     def exit_game(self) -> None:
         import sys
 
-        # self.game.pickle()
+        if self._game is not None:
+            if self._game.status == GameStatus.IN_PROGRESS:
+                self._game.save_to_file()
+            self._game.close()
+        get_audio_service().close()
 
         self.viewer.display("Bye! See you soon!")
 
@@ -208,6 +208,14 @@ class Counter:
     def current(self) -> int:
         return self._current
 
+    @current.setter
+    def current(self, value: int) -> None:
+        if value < self._min or value > self._max:
+            raise ValueError(
+                f"Value {value} is not between {self._min} and {self._max}."
+            )
+        self._current = value
+
     @property
     def length(self) -> int:
         return self._max - self._min
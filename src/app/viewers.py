@@ -3,7 +3,7 @@ from typing import Self
 from app.cli.colors import Color
 from app.cli.formatters import Text
 from app.cli.viewers import TypingDisabledViewer, TypingEnabledViewer, Viewer
-from app.game.models import get_game
+from app.game.models import GameStatus, get_game
 from app.settings.models import get_settings
 from app.utils import get_singleton_instance
 
@@ -108,7 +108,7 @@ class AppViewer:
         return self._color_theme
 
     def get_current_color(self) -> Color:
-        if get_game().status != "in_progress":
+        if get_game().status != GameStatus.IN_PROGRESS:
             return self._color_theme.default
         player_id = get_game().counter.current_player_id
 
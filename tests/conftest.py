@@ -0,0 +1,100 @@
+import math
+import shutil
+import struct
+import wave
+from pathlib import Path
+
+import pytest
+
+from app.game import models
+from app.settings.models import (
+    AudioSettings,
+    GameSettings,
+    PlayerSettings,
+    SamplingSettings,
+    ServicePathsSettings,
+    Settings,
+)
+
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="ffmpeg is needed to decode samples"
+)
+
+
+def write_wav(path: Path, frequency: float, seconds: float, rate: int = 8000) -> Path:
+    """
+    Mono 16-bit sine tone, so every file of a library has different content.
+    """
+    frames = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * n / rate)))
+        for n in range(int(rate * seconds))
+    )
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(rate)
+        file.writeframes(frames)
+    return path
+
+
+@pytest.fixture
+def library(tmp_path: Path) -> Path:
+    library_path = tmp_path / "library"
+    library_path.mkdir()
+    for i in range(4):
+        write_wav(library_path / f"song{i}.wav", frequency=220 + 110 * i, seconds=8)
+    return library_path
+
+
+@pytest.fixture
+def settings(tmp_path: Path, library: Path):
+    """
+    Settings of a short game of two players, with all service files in `tmp_path`.
+    """
+    settings = Settings(
+        game=GameSettings(
+            players_number=2, rounds_number=2, repeats_number=2, clues_number=2
+        ),
+        players=[
+            PlayerSettings(name="ann", path=str(library)),
+            PlayerSettings(name="bob", path=str(library)),
+        ],
+        sampling=SamplingSettings(
+            from_=0.0, to_finish=0.0, distance=1.0, clues_quantity=1
+        ),
+        audio=AudioSettings(preparation_workers=1, prefetch_window=1),
+        service_paths=ServicePathsSettings(
+            game_save_path=str(tmp_path / "game.json"),
+            game_journal_path=str(tmp_path / "game.journal"),
+            library_index_path=str(tmp_path / "library.sqlite"),
+            log_path=str(tmp_path / "app.log"),
+            sample_cache_size=0,
+        ),
+    )
+    Settings._instance = settings
+    yield settings
+
+    models.get_audio_service().close()
+    singletons = (models.GameAudioService, models.AudiofilesRegistry, models.Game)
+    for cls in (*singletons, Settings):
+        if "_instance" in vars(cls):
+            del cls._instance
+
+
+@pytest.fixture
+def game(settings: Settings):
+    """
+    Started game, closed with its processes after the test.
+    """
+    game = models.Game(
+        players=[
+            models.Player(id_=i, name=player.name, library_path=player.path)
+            for i, player in enumerate(settings.players)
+        ],
+        rounds=settings.game.rounds_number,
+    )
+    game.status = models.GameStatus.IN_PROGRESS
+    game.initialize_songs()
+    yield game
+    game.close()
@@ -0,0 +1,112 @@
+import os
+import pickle
+from math import log10
+
+import numpy as np
+import pytest
+
+from app.files import cache as cache_module, decoding
+from app.files.cache import open_sample_cache, SampleCache, SampleKey
+from app.files.decoding import decode_peak, decode_windows, PcmFormat, Window
+
+from tests.conftest import requires_ffmpeg, write_wav
+
+
+def _key(start: int) -> SampleKey:
+    return SampleKey(
+        content_hash="0" * 32, start=start, duration=100, sample_rate=8000, channels=1
+    )
+
+
+def test_cached_sample_is_memory_mapped(tmp_path):
+    cache = SampleCache(tmp_path, max_size=1000)
+    cache.put(_key(0), np.arange(100, dtype=np.int16).tobytes())
+
+    data = cache.get(_key(0))
+
+    assert isinstance(data.obj, cache_module.mmap.mmap)
+    assert np.array_equal(np.frombuffer(data, dtype=np.int16), np.arange(100))
+
+
+def test_missing_and_empty_samples_are_not_hits(tmp_path):
+    cache = SampleCache(tmp_path, max_size=1000)
+    (tmp_path / _key(100).file_name).write_bytes(b"")
+
+    assert cache.get(_key(0)) is None
+    assert cache.get(_key(100)) is None
+
+
+def test_least_recently_used_samples_are_evicted(tmp_path):
+    cache = SampleCache(tmp_path, max_size=300)
+    for start in (0, 100, 200):
+        cache.put(_key(start), bytes(100))
+    cache.get(_key(0))
+
+    cache.put(_key(300), bytes(100))
+
+    assert cache.size == 300
+    assert cache.get(_key(100)) is None
+    assert all(cache.get(_key(start)) is not None for start in (0, 200, 300))
+
+
+def test_directory_is_walked_once(tmp_path, monkeypatch):
+    for start in (0, 100):
+        (tmp_path / _key(start).file_name).write_bytes(bytes(100))
+    walks = []
+    scandir = os.scandir
+    monkeypatch.setattr(
+        cache_module.os, "scandir", lambda path: walks.append(path) or scandir(path)
+    )
+
+    cache = SampleCache(tmp_path, max_size=250)
+    for start in (200, 300, 400):
+        cache.put(_key(start), bytes(100))
+
+    assert len(walks) == 1
+    assert cache.size == 200
+    assert sorted(os.listdir(tmp_path)) == [
+        _key(300).file_name,
+        _key(400).file_name,
+    ]
+
+
+def test_cache_is_shared_in_a_process(tmp_path):
+    cache = open_sample_cache(str(tmp_path), 1000)
+
+    assert pickle.loads(pickle.dumps(cache)) is cache
+
+
+@requires_ffmpeg
+def test_known_content_hash_is_not_computed_again(tmp_path, monkeypatch):
+    path = write_wav(tmp_path / "song.wav", frequency=440, seconds=2)
+    cache = SampleCache(tmp_path / "cache", max_size=10**6)
+
+    def fail(path):
+        raise AssertionError(f"{path} is hashed again")
+
+    monkeypatch.setattr(decoding, "content_hash", fail)
+    decode_windows(
+        path,
+        [Window(start=500, duration=100)],
+        pcm_format=PcmFormat(sample_rate=8000, channels=1),
+        cache=cache,
+        file_hash="0" * 32,
+    )
+
+    assert cache.get(_key(500)) is not None
+
+
+@requires_ffmpeg
+def test_peak_of_track_is_decoded_once(tmp_path, monkeypatch):
+    path = write_wav(tmp_path / "song.wav", frequency=440, seconds=2)
+    cache = SampleCache(tmp_path / "cache", max_size=10**6)
+    pcm_format = PcmFormat(sample_rate=8000, channels=1)
+    peak = decode_peak(path, pcm_format=pcm_format, cache=cache)
+
+    def fail(*args):
+        raise AssertionError("the track is decoded again")
+
+    monkeypatch.setattr(decoding, "_decode", fail)
+
+    assert decode_peak(path, pcm_format=pcm_format, cache=cache) == peak
+    assert peak == pytest.approx(20 * log10(8000 / 2**15), abs=0.01)
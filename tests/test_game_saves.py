@@ -0,0 +1,116 @@
+import logging
+import os
+
+import pytest
+
+from app.exceptions import NotEnoughSongsError
+from app.files.cache import content_hash
+from app.game import models
+from app.game.models import Evaluation, Game, GameStatus
+from app.game.saves import read_save
+
+from tests.conftest import requires_ffmpeg, write_wav
+
+
+pytestmark = requires_ffmpeg
+
+
+def _play_turn(game: Game, answer: str, evaluation: Evaluation) -> None:
+    game.give_answer(answer)
+    game.evaluate(evaluation)
+    game.next_iteration()
+
+
+def test_game_is_saved_when_started(game, settings):
+    save = read_save(settings.service_paths.game_save_path)
+
+    assert save is not None
+    assert save.turn == 0
+    assert [len(player.songs) for player in save.players] == [2, 2]
+
+
+def test_saved_game_is_restored(game):
+    first_song = game.current_song
+    _play_turn(game, "first answer", Evaluation.FULL_ANSWER)
+    game.current_song  # the song of the second turn is taken
+    game.save_to_file()
+    saved = game.to_save()
+    game.close()
+
+    restored = Game.load_from_file()
+
+    assert restored.to_save() == saved
+    assert restored.turn == 1
+    assert restored.players[0].songs[0].path == first_song.path
+    assert restored.players[0].songs[0].answer.evaluation == Evaluation.FULL_ANSWER
+    restored.close()
+
+
+def test_restored_game_prepares_the_same_songs(game):
+    game.save_to_file()
+    song = game.current_song
+    game.close()
+
+    restored = Game.load_from_file()
+    restored_song = restored.current_song
+
+    assert restored_song.path == song.path
+    assert [s.start_time for s in restored_song.samples] == [
+        s.start_time for s in song.samples
+    ]
+    restored.close()
+
+
+def test_snapshots_do_not_hash_audiofiles_again(game, monkeypatch):
+    def fail(path):
+        raise AssertionError(f"{path} is hashed again")
+
+    monkeypatch.setattr(models, "content_hash", fail)
+    game.save_to_file()
+
+
+def test_changed_audiofile_is_prepared_again(game, settings, caplog):
+    song = game.current_song
+    game.save_to_file()
+    game.close()
+    write_wav(song.path, frequency=1000, seconds=6)
+
+    with caplog.at_level(logging.WARNING):
+        restored = Game.load_from_file()
+
+    assert str(song.path) in caplog.text
+    restored_song = restored.players[0].songs[0]
+    assert restored_song.metadata.length < song.metadata.length
+    assert all(s.pcm is not None for s in restored_song.samples)
+    restored.save_to_file()
+    save = read_save(settings.service_paths.game_save_path)
+    assert save.players[0].songs[0].content_hash == content_hash(song.path)
+    restored.close()
+
+
+def test_finished_game_leaves_nothing_to_resume(game, settings):
+    for _ in range(game.rounds * len(game.players) - 1):
+        _play_turn(game, "answer", Evaluation.HALF_ANSWER)
+
+    with pytest.raises(StopIteration):
+        _play_turn(game, "last answer", Evaluation.FULL_ANSWER)
+
+    assert game.status == GameStatus.FINISHED
+    assert not os.path.exists(settings.service_paths.game_save_path)
+    assert not os.path.exists(settings.service_paths.game_journal_path)
+    assert Game.load_from_file() is None
+    assert game.players[1].songs[1].answer.answer_prompt == "last answer"
+
+
+def test_game_is_not_started_with_fewer_songs_than_rounds(settings, library):
+    (library / "song0.wav").unlink()
+    players = [
+        models.Player(id_=i, name=player.name, library_path=player.path)
+        for i, player in enumerate(settings.players)
+    ]
+    game = Game(players=players, rounds=4)
+
+    with pytest.raises(NotEnoughSongsError, match="ann's library .* 3 audiofiles"):
+        game.initialize_songs()
+
+    assert read_save(settings.service_paths.game_save_path) is None
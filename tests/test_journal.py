@@ -0,0 +1,111 @@
+import pytest
+
+from app.game import journal, saves
+from app.game.journal import FsyncPolicy, GameJournal, JournalEvent, read_journal
+from app.game.models import Evaluation, Game
+from app.game.saves import GameSave, read_save, write_save
+
+from tests.conftest import requires_ffmpeg
+
+
+def _record_turn(game_journal: GameJournal) -> None:
+    game_journal.record(JournalEvent.SAMPLE_PLAYED)
+    game_journal.record(JournalEvent.ANSWER_GIVEN, answer_prompt="answer")
+    game_journal.record(JournalEvent.EVALUATED, evaluation="full_answer")
+    game_journal.record(JournalEvent.TURN_STARTED)
+
+
+def test_journal_entries_are_read_after_number(tmp_path):
+    path = tmp_path / "journal"
+    game_journal = GameJournal(path, fsync=FsyncPolicy.NEVER, number=10)
+    _record_turn(game_journal)
+    game_journal.close()
+
+    entries = read_journal(path, after=12)
+
+    assert [entry.number for entry in entries] == [13, 14]
+    assert entries[0].event == JournalEvent.EVALUATED
+    assert entries[0].data == {"evaluation": "full_answer"}
+
+
+def test_journal_is_read_up_to_torn_last_line(tmp_path):
+    path = tmp_path / "journal"
+    game_journal = GameJournal(path, fsync=FsyncPolicy.NEVER)
+    _record_turn(game_journal)
+    game_journal.close()
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"number":5,"event":"sample_pl')  # crashed in the middle
+
+    assert [entry.number for entry in read_journal(path)] == [1, 2, 3, 4]
+
+
+def test_missing_journal_is_empty(tmp_path):
+    assert read_journal(tmp_path / "journal") == []
+
+
+def test_truncated_journal_keeps_numbering(tmp_path):
+    path = tmp_path / "journal"
+    game_journal = GameJournal(path, fsync=FsyncPolicy.NEVER)
+    _record_turn(game_journal)
+    game_journal.truncate()
+    game_journal.record(JournalEvent.SAMPLE_PLAYED)
+    game_journal.close()
+
+    assert [entry.number for entry in read_journal(path)] == [5]
+
+
+@pytest.mark.parametrize(
+    "policy, fsyncs_number",
+    [(FsyncPolicy.ALWAYS, 4), (FsyncPolicy.TURN, 2), (FsyncPolicy.NEVER, 0)],
+)
+def test_journal_fsync_policy(tmp_path, monkeypatch, policy, fsyncs_number):
+    fsyncs = []
+    monkeypatch.setattr(journal.os, "fsync", fsyncs.append)
+
+    game_journal = GameJournal(tmp_path / "journal", fsync=policy)
+    _record_turn(game_journal)
+    game_journal.close()
+
+    assert len(fsyncs) == fsyncs_number
+
+
+@pytest.mark.parametrize("fsync", [True, False])
+def test_save_is_synced_before_it_replaces_the_previous_one(
+    tmp_path, monkeypatch, fsync
+):
+    calls = []
+    replace = saves.os.replace
+    monkeypatch.setattr(saves.os, "fsync", lambda fd: calls.append("fsync"))
+    monkeypatch.setattr(
+        saves.os, "replace", lambda *paths: calls.append("replace") or replace(*paths)
+    )
+    save = GameSave(rounds=1, status="in_progress", turn=0, sampling={}, players=[])
+
+    write_save(tmp_path / "save", save, fsync=fsync)
+
+    assert read_save(tmp_path / "save") == save
+    if fsync:  # the file, then the directory with its new name
+        assert calls == ["fsync", "replace", "fsync"]
+    else:
+        assert calls == ["replace"]
+
+
+@requires_ffmpeg
+def test_journaled_game_is_replayed_to_the_same_state(game, settings):
+    game.give_answer("first answer")
+    game.evaluate(Evaluation.FULL_ANSWER)
+    game.next_iteration()
+    game.give_answer("second answer")
+    state = game.to_save()
+    game.close()
+    with open(settings.service_paths.game_journal_path, "a") as file:
+        file.write('{"number":')  # torn by a crash
+
+    entries = read_journal(settings.service_paths.game_journal_path)
+    restored = Game.load_from_file()
+
+    assert len(entries) == 6  # two songs taken and four events of turns
+    assert restored.to_save() == state
+    assert restored.turn == 1
+    assert restored.current_song.answer.answer_prompt == "second answer"
+    restored.close()
@@ -0,0 +1,65 @@
+from app.files.cache import content_hash
+from app.files.decoding import decode_full, PcmFormat, Window
+from app.library import pack as pack_module
+from app.library.pack import build_pack, ProxyPack
+
+from tests.conftest import requires_ffmpeg
+
+
+pytestmark = requires_ffmpeg
+
+
+def test_pack_is_built_with_progress(tmp_path, library):
+    audiofiles = sorted(library.iterdir())
+    reports = []
+
+    report = build_pack(
+        tmp_path / "library.pack",
+        audiofiles,
+        PcmFormat(sample_rate=8000, channels=1),
+        workers=2,
+        on_progress=reports.append,
+    )
+
+    assert report.tracks_number == len(audiofiles)
+    assert [str(progress) for progress in reports] == ["2/4", "4/4"]
+    assert reports[-1].is_finished and not reports[0].is_finished
+
+    pack = ProxyPack(tmp_path / "library.pack")
+    windows = pack.windows(
+        audiofiles[0], [Window(1000, 500)], PcmFormat(sample_rate=8000, channels=1)
+    )
+    assert [len(window) for window in windows] == [500]
+    pack.close()
+
+
+def test_known_content_hash_is_not_computed_again(tmp_path, library, monkeypatch):
+    audiofile = next(library.iterdir())
+    pcm_format = PcmFormat(sample_rate=8000, channels=1)
+    build_pack(tmp_path / "library.pack", [audiofile], pcm_format)
+    file_hash = content_hash(audiofile)
+
+    def fail(path):
+        raise AssertionError(f"{path} is hashed again")
+
+    monkeypatch.setattr(pack_module, "content_hash", fail)
+    pack = ProxyPack(tmp_path / "library.pack")
+    windows = pack.windows(audiofile, [Window(0, 500)], pcm_format, file_hash=file_hash)
+
+    assert [len(window) for window in windows] == [500]
+    pack.close()
+
+
+def test_peaks_of_tracks_are_packed_and_reused(tmp_path, library):
+    audiofile = next(library.iterdir())
+    pcm_format = PcmFormat(sample_rate=8000, channels=1)
+    build_pack(tmp_path / "library.pack", [audiofile], pcm_format)
+
+    report = build_pack(tmp_path / "library.pack", [audiofile], pcm_format)
+
+    pack = ProxyPack(tmp_path / "library.pack")
+    peak = decode_full(audiofile, pcm_format=pcm_format).max_dBFS
+    assert report.reused_number == 1
+    assert pack.peak(content_hash(audiofile)) == peak
+    assert pack.peak("0" * 32) is None
+    pack.close()
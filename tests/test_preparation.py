@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.exceptions import DecodingError, PreparationError
+from app.game.models import Game
+from app.game.preparation import PreparationPipeline
+
+from tests.conftest import requires_ffmpeg
+
+
+def _fail_on_two(job: int) -> int:
+    if job == 2:
+        raise DecodingError(f"job {job}")
+    return job * 10
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = PreparationPipeline(
+        _fail_on_two, range(4), window=1, executor=ThreadPoolExecutor(1), start=1
+    )
+    yield pipeline
+    pipeline.shutdown()
+
+
+def test_results_are_given_in_order_of_jobs(pipeline):
+    assert [pipeline.get(index) for index in (1, 3)] == [10, 30]
+    assert pipeline.metrics.jobs_number == 3
+
+
+def test_failed_job_is_reported_and_others_go_on(pipeline):
+    with pytest.raises(PreparationError, match="Job 2 failed") as error:
+        pipeline.get(2)
+
+    assert isinstance(error.value.__cause__, DecodingError)
+    assert pipeline.get(3) == 30
+
+
+@pytest.mark.parametrize("index", [0, 4, -1])
+def test_results_given_away_or_missing_are_not_requested(pipeline, index):
+    with pytest.raises(IndexError):
+        pipeline.get(index)
+
+
+def test_result_is_given_away_once(pipeline):
+    pipeline.get(1)
+
+    with pytest.raises(IndexError, match="already given away"):
+        pipeline.get(1)
+
+
+@requires_ffmpeg
+def test_song_of_failed_job_is_chosen_again(game):
+    failed = game._jobs[0]
+    os.remove(failed.path)  # so it cannot be prepared in this process either
+    game._stop_preparation()
+    game._preparation = PreparationPipeline(
+        _fail_on_two, [2] * len(game._jobs), window=1
+    )
+
+    song = game.current_song
+    state = game.to_save()
+    game.close()
+
+    player_paths = {game._jobs[turn].path for turn in (0, 2)}
+    assert game._jobs[0].path != failed.path and len(player_paths) == 2
+    assert song.path == game._jobs[0].path and song.samples
+    restored = Game.load_from_file()
+    assert restored.to_save() == state
+    restored.close()
@@ -0,0 +1,333 @@
+import struct
+from pathlib import Path
+
+import pytest
+
+from app.exceptions import ProbeError
+from app.files import probe as probe_module
+from app.files.formats import AllowedFormats
+from app.files.probe import probe, read_tags
+
+
+# FLAC
+
+
+def _flac_block(block_type: int, data: bytes, is_last: bool = False) -> bytes:
+    return (
+        bytes([block_type | (0x80 if is_last else 0)])
+        + len(data).to_bytes(3, "big")
+        + data
+    )
+
+
+def _stream_info(sample_rate: int, channels: int, total_samples: int) -> bytes:
+    bits = (sample_rate << 44) | ((channels - 1) << 41) | (15 << 36) | total_samples
+    return bytes(10) + bits.to_bytes(8, "big") + bytes(16)
+
+
+def _vorbis_comments(*comments: str, number: int | None = None) -> bytes:
+    vendor = b"test"
+    data = struct.pack("<I", len(vendor)) + vendor
+    data += struct.pack("<I", len(comments) if number is None else number)
+    for comment in comments:
+        encoded = comment.encode()
+        data += struct.pack("<I", len(encoded)) + encoded
+    return data
+
+
+def _write(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+def test_flac_duration_and_tags(tmp_path):
+    path = _write(
+        tmp_path / "song.flac",
+        b"fLaC"
+        + _flac_block(0, _stream_info(44100, 2, 44100 * 90 + 22050))
+        + _flac_block(1, bytes(100))  # padding is skipped
+        + _flac_block(
+            4,
+            _vorbis_comments(
+                "TITLE=Song",
+                "artist=Band",
+                "ALBUM=Record",
+                "DATE=2004-05-01",
+                "TRACKNUMBER=3/12",
+            ),
+            is_last=True,
+        ),
+    )
+
+    result = probe(path)
+
+    assert (result.format, result.sample_rate, result.channels) == (
+        AllowedFormats.FLAC,
+        44100,
+        2,
+    )
+    assert result.tags == {
+        "title": "Song",
+        "artist": "Band",
+        "album": "Record",
+        "year": 2004,
+        "track_number": 3,
+        "length": 90500,
+    }
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(b"OggS" + bytes(40), id="no marker"),
+        pytest.param(b"fLaC\x00\x00", id="truncated block header"),
+        pytest.param(b"fLaC" + _flac_block(1, bytes(4), is_last=True), id="no info"),
+        pytest.param(
+            b"fLaC" + _flac_block(0, _stream_info(44100, 2, 1000), True)[:16],
+            id="truncated info",
+        ),
+        pytest.param(
+            b"fLaC" + _flac_block(0, _stream_info(44100, 2, 0), True),
+            id="unknown length",
+        ),
+    ],
+)
+def test_malformed_flac_is_not_probed(tmp_path, data):
+    with pytest.raises(ProbeError):
+        probe(_write(tmp_path / "song.flac", data), AllowedFormats.FLAC)
+
+
+def test_truncated_flac_comments_are_skipped(tmp_path):
+    comments = _vorbis_comments("TITLE=Song", number=2**32 - 1)[:-3]
+    path = _write(
+        tmp_path / "song.flac",
+        b"fLaC"
+        + _flac_block(0, _stream_info(8000, 1, 8000))
+        + _flac_block(4, comments, is_last=True),
+    )
+
+    result = probe(path)
+
+    assert result.length == 1000
+    assert result.title is None
+
+
+# MP3
+
+_FRAME_HEADER = b"\xff\xfb\x90\x00"  # MPEG-1 layer III, 128 kbps, 44.1 kHz, stereo
+_FRAME_LENGTH = 417
+_XING_OFFSET = 4 + 32  # after the side info of a stereo frame
+
+
+def _frames(number: int, first: bytes = b"") -> bytes:
+    first_frame = (_FRAME_HEADER + first).ljust(_FRAME_LENGTH, b"\x00")
+    frame = _FRAME_HEADER.ljust(_FRAME_LENGTH, b"\x00")
+    return first_frame + frame * (number - 1)
+
+
+def _id3v2(*frames: tuple[str, str], version: int = 3) -> bytes:
+    data = b""
+    for frame_id, text in frames:
+        payload = b"\x03" + text.encode()  # utf-8
+        if version == 2:
+            data += frame_id.encode() + len(payload).to_bytes(3, "big") + payload
+        else:
+            data += frame_id.encode() + len(payload).to_bytes(4, "big") + bytes(2)
+            data += payload
+    data += bytes(16)  # padding
+    size = bytes((len(data) >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3" + bytes([version, 0, 0]) + size + data
+
+
+def _id3v1(title: str, track_number: int) -> bytes:
+    return (
+        b"TAG"
+        + title.encode().ljust(30, b"\x00")
+        + b"Band".ljust(30, b"\x00")
+        + b"Record".ljust(30, b"\x00")
+        + b"1999"
+        + bytes(28)
+        + bytes([0, track_number, 0])
+    )
+
+
+def test_mp3_cbr_duration_and_id3v2_tags(tmp_path):
+    tag = _id3v2(
+        ("TIT2", "Song"),
+        ("TPE1", "Band"),
+        ("TALB", "Record"),
+        ("TYER", "2004"),
+        ("TRCK", "3/12"),
+    )
+    path = _write(tmp_path / "song.mp3", tag + _frames(100))
+
+    result = probe(path)
+
+    assert (result.sample_rate, result.channels) == (44100, 2)
+    assert result.tags == {
+        "title": "Song",
+        "artist": "Band",
+        "album": "Record",
+        "year": 2004,
+        "track_number": 3,
+        "length": 100 * _FRAME_LENGTH * 8 // 128,
+    }
+
+
+def test_mp3_id3v22_tags(tmp_path):
+    tag = _id3v2(("TT2", "Song"), ("TP1", "Band"), version=2)
+    path = _write(tmp_path / "song.mp3", tag + _frames(10))
+
+    result = probe(path)
+
+    assert (result.title, result.artist) == ("Song", "Band")
+
+
+def test_mp3_id3v1_tags_are_used_without_id3v2(tmp_path):
+    path = _write(tmp_path / "song.mp3", _frames(100) + _id3v1("Song", 7))
+
+    result = probe(path)
+
+    assert (result.title, result.year, result.track_number) == ("Song", 1999, 7)
+    assert result.length == 100 * _FRAME_LENGTH * 8 // 128  # the tag is not audio
+
+
+def test_mp3_xing_duration_with_lame_gapless_info(tmp_path):
+    delays = (576 << 12) | 1000
+    lame = b"LAME3.100".ljust(21, b"\x00") + delays.to_bytes(3, "big")
+    xing = b"Xing" + struct.pack(">II", 0x1, 1000) + lame
+    path = _write(
+        tmp_path / "song.mp3", _frames(3, first=bytes(_XING_OFFSET - 4) + xing)
+    )
+
+    result = probe(path)
+
+    assert result.length == (1000 * 1152 - 576 - 1000) * 1000 // 44100
+
+
+def test_mp3_vbri_duration(tmp_path):
+    vbri = b"VBRI" + bytes(10) + struct.pack(">I", 500)
+    path = _write(
+        tmp_path / "song.mp3", _frames(3, first=bytes(_XING_OFFSET - 4) + vbri)
+    )
+
+    result = probe(path)
+
+    assert result.length == 500 * 1152 * 1000 // 44100
+
+
+def test_truncated_xing_header_falls_back_to_cbr(tmp_path):
+    path = _write(
+        tmp_path / "song.mp3", (_FRAME_HEADER + bytes(_XING_OFFSET - 4) + b"Xing")
+    )
+
+    result = probe(path)
+
+    assert result.length == (_XING_OFFSET + 4) * 8 // 128
+
+
+def test_truncated_id3v2_tag_is_skipped(tmp_path):
+    tag = _id3v2(("TIT2", "Song"))
+    truncated = tag[:6] + b"\x00\x00\x7f\x7f" + tag[10:18]  # size beyond the file
+
+    with pytest.raises(ProbeError):  # no audio after the tag
+        probe(_write(tmp_path / "song.mp3", truncated), AllowedFormats.MP3)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(bytes(1000), id="no frames"),
+        pytest.param(b"\xff\xff\xff\xff" * 100, id="invalid frames"),
+        pytest.param(b"", id="empty"),
+    ],
+)
+def test_malformed_mp3_is_not_probed(tmp_path, data):
+    with pytest.raises(ProbeError):
+        probe(_write(tmp_path / "song.mp3", data), AllowedFormats.MP3)
+
+
+# WAV
+
+
+def _chunk(chunk_id: bytes, data: bytes) -> bytes:
+    return chunk_id + struct.pack("<I", len(data)) + data + bytes(len(data) % 2)
+
+
+def _wav(*chunks: bytes) -> bytes:
+    data = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(data)) + data
+
+
+def _fmt(sample_rate: int = 8000, channels: int = 1) -> bytes:
+    byte_rate = sample_rate * channels * 2
+    return _chunk(
+        b"fmt ", struct.pack("<HHIIHH", 1, channels, sample_rate, byte_rate, 4, 16)
+    )
+
+
+def _info(**tags: bytes) -> bytes:
+    return _chunk(
+        b"LIST",
+        b"INFO" + b"".join(_chunk(key.encode(), value) for key, value in tags.items()),
+    )
+
+
+def test_wav_duration_and_info_tags(tmp_path):
+    path = _write(
+        tmp_path / "song.wav",
+        _wav(
+            _fmt(8000, 2),
+            _info(INAM=b"Song\x00", IART=b"Band", IPRD=b"Rec", ICRD=b"2004", ITRK=b"3"),
+            _chunk(b"data", bytes(8000 * 2 * 2 * 3)),
+        ),
+    )
+
+    result = probe(path)
+
+    assert (result.sample_rate, result.channels) == (8000, 2)
+    assert result.tags == {
+        "title": "Song",
+        "artist": "Band",
+        "album": "Rec",
+        "year": 2004,
+        "track_number": 3,
+        "length": 3000,
+    }
+
+
+def test_truncated_wav_data_is_measured_by_file_size(tmp_path):
+    data = _wav(_fmt(), _chunk(b"data", bytes(8000 * 2 * 4)))
+    path = _write(tmp_path / "song.wav", data[: -8000 * 2 * 2])
+
+    assert probe(path).length == 2000
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param(b"RIFX" + bytes(40), id="no riff"),
+        pytest.param(b"RIFF\x00\x00", id="truncated header"),
+        pytest.param(_wav(_fmt()), id="no data"),
+        pytest.param(_wav(_chunk(b"data", bytes(100))), id="no fmt"),
+        pytest.param(
+            _wav(_chunk(b"fmt ", bytes(16)), _chunk(b"data", bytes(100))),
+            id="zero byte rate",
+        ),
+    ],
+)
+def test_malformed_wav_is_not_probed(tmp_path, data):
+    with pytest.raises(ProbeError):
+        probe(_write(tmp_path / "song.wav", data), AllowedFormats.WAV)
+
+
+def test_malformed_headers_fall_back_to_music_tag(tmp_path, monkeypatch):
+    tags = {"title": "Song", "length": 1000}
+    monkeypatch.setattr(probe_module, "_read_tags_with_music_tag", lambda path: tags)
+
+    for name, data, format_ in (
+        ("song.flac", b"fLaC", AllowedFormats.FLAC),
+        ("song.mp3", bytes(100), AllowedFormats.MP3),
+        ("song.wav", b"RIFF", AllowedFormats.WAV),
+    ):
+        assert read_tags(_write(tmp_path / name, data), format_) == tags
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from app.files.walker import is_walked, LibraryWalker
+from app.library.registry import LibraryRegistry
+
+
+class _PathsRegistry(LibraryRegistry[str]):
+    def __init__(self) -> None:
+        super().__init__()
+        self.loaded: list[str] = []
+
+    def load(self, root: str) -> list[str]:
+        self.loaded.append(root)
+        return sorted(entry.path for entry in LibraryWalker(root, accept=bool))
+
+    def path_of(self, item: str) -> str:
+        return item
+
+    def includes(self, root: str, path: str) -> bool:
+        return is_walked(root, path)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for directory in ("inner", ".hidden", "skipped", "skipped/deeper"):
+        os.makedirs(tmp_path / "outer" / directory)
+        (tmp_path / "outer" / directory / "song.mp3").touch()
+    (tmp_path / "outer" / ".songignore").write_text("skipped/\n")
+    return tmp_path
+
+
+def test_nested_library_is_a_view_of_the_outer_one(tree):
+    registry = _PathsRegistry()
+    registry.register(tree / "outer", tree / "outer" / "inner")
+
+    view = registry.view(tree / "outer" / "inner")
+
+    assert list(view) == [str(tree / "outer" / "inner" / "song.mp3")]
+    assert registry.loaded == [str(tree / "outer")]
+
+
+@pytest.mark.parametrize("nested", [".hidden", "skipped", "skipped/deeper"])
+def test_library_pruned_by_the_outer_one_is_scanned_on_its_own(tree, nested):
+    registry = _PathsRegistry()
+    registry.register(tree / "outer", tree / "outer" / nested)
+
+    view = registry.view(tree / "outer" / nested)
+
+    assert str(tree / "outer" / nested / "song.mp3") in list(view)
+    assert registry.loaded == [str(tree / "outer" / nested)]
+    assert len(registry.view(tree / "outer")) == 1
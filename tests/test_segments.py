@@ -0,0 +1,27 @@
+from math import inf
+
+import numpy as np
+
+from app.files.segments import (
+    gain_to_peak,
+    NORMALIZATION_HEADROOM,
+    peak_gain,
+    PlayableSegment,
+)
+
+
+def _segment(*samples: int) -> PlayableSegment:
+    return PlayableSegment(np.array(samples, dtype=np.int16).reshape(-1, 1), 8000)
+
+
+def test_gain_brings_loudest_peak_below_maximum():
+    quiet, loud = _segment(0, 1000, -1000), _segment(0, 2**14, -100)
+
+    assert peak_gain(quiet, loud) == gain_to_peak(loud.max_dBFS)
+    assert peak_gain(loud) == -NORMALIZATION_HEADROOM - loud.max_dBFS
+
+
+def test_silence_and_nothing_are_not_amplified():
+    assert gain_to_peak(-inf) == 0.0
+    assert peak_gain(_segment(0, 0)) == 0.0
+    assert peak_gain() == 0.0
@@ -0,0 +1,20 @@
+import random
+
+import pytest
+
+from app.game.selection import SAMPLES_STRATEGIES_MAPPING
+
+
+@pytest.mark.parametrize("strategy", sorted(SAMPLES_STRATEGIES_MAPPING))
+def test_samples_depend_only_on_the_seed(strategy):
+    def choose(seed: int) -> list[int]:
+        return SAMPLES_STRATEGIES_MAPPING[strategy](
+            length=180_000, distance=10_000, quantity=3, rng=random.Random(seed)
+        )()
+
+    random.seed(1)
+    first = choose(42)
+    random.seed(2)
+
+    assert choose(42) == first
+    assert random.random() == random.Random(2).random()  # global state is kept
@@ -0,0 +1,31 @@
+from typing import Generator
+
+import numpy as np
+
+from app.files.segments import PlayableSegment
+from app.files.service import _with_gain
+
+
+def _chunks(*amplitudes: int) -> Generator[PlayableSegment, None, None]:
+    for amplitude in amplitudes:
+        yield PlayableSegment(np.full((100, 2), amplitude, dtype=np.int16), 8000)
+
+
+def test_streamed_chunks_are_amplified_by_gain():
+    chunks = list(_with_gain(_chunks(100, 200), gain=20.0))
+
+    assert [chunk.peak for chunk in chunks] == [1000, 2000]
+
+
+def test_streamed_gain_is_limited_by_loud_chunks():
+    chunks = list(_with_gain(_chunks(100, 30000, 100), gain=40.0))
+
+    assert chunks[0].peak == 10000
+    assert 30000 <= chunks[1].peak < 2**15 - 1  # not clipped
+    assert chunks[2].peak < 200  # the limit is kept after the loud chunk
+
+
+def test_streamed_silence_does_not_limit_gain():
+    chunks = list(_with_gain(_chunks(0, 100), gain=20.0))
+
+    assert [chunk.peak for chunk in chunks] == [0, 1000]
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import textwrap
+
+
+_SCRIPT = textwrap.dedent(
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    import numpy as np
+
+    from app.files.segments import PlayableSegment
+    from app.files.shared import share_pcm, SharedPcmBlocks, unlink_block
+
+
+    if __name__ == "__main__":
+        segment = PlayableSegment(np.arange(800, dtype=np.int16).reshape(-1, 1), 8000)
+        # the worker starts a resource tracker of its own, which stops with it
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            kept, discarded = executor.map(share_pcm, [[segment], [segment]])
+
+        blocks = SharedPcmBlocks()
+        (handle,) = kept
+        blocks.acquire(handle.name)
+        assert blocks.segment(handle).raw_data == segment.raw_data
+        blocks.release(handle.name)
+        unlink_block(discarded[0].name)
+    """
+)
+
+
+def test_shared_blocks_are_not_reported_as_leaked(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(_SCRIPT)
+
+    process = subprocess.run(
+        [sys.executable, "-X", "dev", str(script)],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert "leaked shared_memory" not in process.stderr
+    assert "Traceback" not in process.stderr
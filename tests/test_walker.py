@@ -0,0 +1,58 @@
+import os
+
+from app.cli.viewers import ProgressViewer
+from app.files.walker import contains_audiofiles, LibraryWalker, WalkProgress
+
+from tests.conftest import write_wav
+
+
+def _progress(is_finished: bool) -> WalkProgress:
+    return WalkProgress(
+        dirs_visited=2,
+        dirs_pending=1,
+        files_seen=10,
+        candidates_found=3,
+        seconds=1.0,
+        is_finished=is_finished,
+    )
+
+
+def test_progress_is_rewritten_in_one_line(capsys):
+    show = ProgressViewer("Scanning libraries")
+
+    show(_progress(is_finished=False))
+    show(_progress(is_finished=True))
+
+    assert capsys.readouterr().out == (
+        "\rScanning libraries: 2 dirs visited, 3 audiofiles found, "
+        "10 files/sec, ETA 0 s\033[K"
+        "\rScanning libraries: 2 dirs visited, 3 audiofiles found, "
+        "10 files/sec, done in 1.0 s\033[K\n"
+    )
+
+
+def test_walk_for_audiofiles_reports_progress(tmp_path):
+    (tmp_path / "empty").mkdir()
+    write_wav(tmp_path / "song.wav", frequency=440, seconds=0.1)
+    reports = []
+
+    assert not contains_audiofiles(tmp_path / "empty", on_progress=reports.append)
+    assert contains_audiofiles(tmp_path, on_progress=reports.append)
+
+    assert [report.is_finished for report in reports] == [True]
+
+
+def test_symlink_and_its_target_are_walked_once(tmp_path):
+    (tmp_path / "a").mkdir()
+    write_wav(tmp_path / "a" / "x.wav", frequency=440, seconds=0.1)
+    (tmp_path / "link.wav").symlink_to(tmp_path / "a" / "x.wav")
+
+    assert len(list(LibraryWalker(tmp_path))) == 1
+
+
+def test_hardlinks_are_walked_once(tmp_path):
+    write_wav(tmp_path / "x.wav", frequency=440, seconds=0.1)
+    os.link(tmp_path / "x.wav", tmp_path / "y.wav")
+    write_wav(tmp_path / "z.wav", frequency=880, seconds=0.1)
+
+    assert len(list(LibraryWalker(tmp_path))) == 2